@@ -0,0 +1,135 @@
+"""
+Async serving path (ASGI) for the HTML form in main.py.
+
+The Flask view blocks a worker thread for all of its LLM round-trips. Here the
+same request flow runs on an event loop: LLM calls are awaited through one
+pooled Gemini client per worker (config.configure_genai bounds its keep-alive
+pool) and an AsyncLLMScheduler, so a request waiting on the network holds no
+thread. CPU-bound symbolic work runs in a bounded thread pool
+(SYMBOLIC_WORKERS, default one per CPU) so it does not stall the loop.
+
+    uvicorn asgi:app --workers 4
+
+The JSON endpoints (/api/solve, /api/plot) stay on the WSGI app.
+"""
+
+import asyncio
+import os
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+
+from quart import Quart, request, render_template, make_response
+
+from utils.gemini import aquery_llm, format_llm_output, aextract_expression, aclassify_math_query, LLMError
+from utils.router import route_query, local_query_type, normalize_raw_expression
+from utils.llm_scheduler import AsyncLLMScheduler, LLMUnavailable
+from utils.traffic import RequestTrace, TrafficRecorder
+from utils.symbolic.guards import MemoryTracker, memory_stage
+from utils.symbolic.workspace import WorkspaceStore
+
+app = Quart(__name__)
+traffic_recorder = TrafficRecorder.from_env()
+workspace_store = WorkspaceStore.from_env()
+WORKSPACE_COOKIE = "workspace"
+llm_scheduler = None
+symbolic_executor = ThreadPoolExecutor(max_workers=int(os.getenv("SYMBOLIC_WORKERS", os.cpu_count() or 1)),
+                                       thread_name_prefix="symbolic")
+
+
+@app.before_serving
+async def init_llm():
+    """One client and scheduler per worker, created inside its event loop."""
+    global llm_scheduler
+    from config import configure_genai
+    llm_scheduler = AsyncLLMScheduler.from_env(configure_genai())
+
+
+def _symbolic(category, expr, memory, workspace):
+    with memory.activate(), memory_stage("symbolic"):
+        return route_query(category, expr, workspace=workspace)
+
+
+@app.route("/", methods=["GET", "POST"])
+async def index():
+    explanation = ""
+    math_result = {}
+    error_message = None
+    session_id = request.cookies.get(WORKSPACE_COOKIE) or secrets.token_urlsafe(16)
+
+    if request.method == "POST":
+        query = (await request.form)["query"]
+        trace = RequestTrace(query)
+        memory = MemoryTracker()
+        llm = llm_scheduler.for_request()
+        degraded_reason = None
+        try:
+            # Classification, explanation and extraction are independent: run them concurrently
+            async def classify():
+                with trace.stage("classify"):
+                    try:
+                        return await aclassify_math_query(query, llm), None
+                    except LLMUnavailable as e:
+                        category = await asyncio.get_running_loop().run_in_executor(
+                            symbolic_executor, local_query_type, normalize_raw_expression(query))
+                        return category, str(e)
+
+            async def explain():
+                with trace.stage("explain"):
+                    try:
+                        return await aquery_llm(f"{query}", llm), None
+                    except LLMUnavailable as e:
+                        return "", str(e)
+
+            async def extract():
+                with trace.stage("extract"):
+                    try:
+                        return await aextract_expression(query, llm), None
+                    except LLMUnavailable as e:
+                        return normalize_raw_expression(query), str(e)
+
+            (category, r1), (raw_explanation, r2), (expr, r3) = await asyncio.gather(classify(), explain(), extract())
+            degraded_reason = r3 or r2 or r1
+            trace.category, trace.explanation, trace.expression = category, raw_explanation, expr
+            explanation = format_llm_output(raw_explanation)
+            print(expr)
+
+            with trace.stage("symbolic"):
+                math_result = await asyncio.get_running_loop().run_in_executor(
+                    symbolic_executor, _symbolic, category, expr, memory, workspace_store.get(session_id))
+
+            # LLM unavailable: serve the symbolic-only result
+            if degraded_reason and not explanation:
+                explanation = f"<em>Explanation unavailable ({degraded_reason}); showing symbolic result only.</em>"
+
+            # Check for errors in math_result
+            if "error" in math_result:
+                error_message = f"Mathematical Error: {math_result['error']}"
+                if memory.enabled:
+                    error_message += f" (peak memory {memory.peak_bytes / 2**20:.1f} MiB)"
+                print("Symbolic error:", math_result.get("error_type", "error"), memory.summary())
+                math_result = {}
+
+        except LLMError as e:
+            error_message = str(e)
+            explanation = ""
+            math_result = {}
+        except Exception as e:
+            error_message = f"An unexpected error occurred: {str(e)}"
+            print("Unexpected error:", repr(e), memory.summary())
+            explanation = ""
+            math_result = {}
+
+        if traffic_recorder is not None:
+            trace.error = error_message
+            trace.memory = memory.summary()
+            traffic_recorder.record(trace)
+
+    response = await make_response(await render_template(
+        "index.html",
+        explanation=explanation,
+        math_result=math_result,
+        error_message=error_message
+    ))
+    if request.cookies.get(WORKSPACE_COOKIE) != session_id:
+        response.set_cookie(WORKSPACE_COOKIE, session_id, httponly=True, samesite="Lax")
+    return response
@@ -0,0 +1,121 @@
+"""
+Load test: sync WSGI (gunicorn, 1 worker x --threads) vs. async ASGI (uvicorn,
+1 worker) serving the HTML form against a local fake LLM.
+
+Both servers are started as subprocesses with GEMINI_FAKE_LATENCY_S set, so
+every request spends 3 x --llm-latency seconds waiting on the "network". The
+LLM scheduler limits are raised for both so only the serving model differs.
+
+    python benchmarks/asgi_load.py --llm-latency 0.3 --concurrency 4 16 64 256
+
+Reports throughput, p50/p99 latency and the number of requests the worker
+serves concurrently: throughput x unloaded latency (Little's law with the
+service time measured by a single sequential client, so time spent queued
+for a thread is not counted).
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parents[1]
+QUERY = "x^3 - 3*x"
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(kind, port, threads, llm_latency):
+    env = dict(os.environ, GEMINI_FAKE_LATENCY_S=str(llm_latency), LLM_MAX_CONCURRENCY="1024",
+               LLM_MAX_QUEUE="4096", SKIP_WARMUP="1")
+    if kind == "wsgi":
+        cmd = [sys.executable, "-m", "gunicorn", "-w", "1", "--threads", str(threads),
+               "-b", f"127.0.0.1:{port}", "--timeout", "120", "main:app"]
+    else:
+        cmd = [sys.executable, "-m", "uvicorn", "asgi:app", "--workers", "1",
+               "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"]
+    proc = subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/", timeout=1)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.5)
+    proc.kill()
+    raise RuntimeError(f"{kind} server did not start")
+
+
+async def run_load(url, concurrency, total):
+    latencies, errors = [], 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=300) as client:
+        queue = asyncio.Queue()
+        for _ in range(total):
+            queue.put_nowait(None)
+
+        async def worker():
+            nonlocal errors
+            while not queue.empty():
+                queue.get_nowait()
+                t = time.perf_counter()
+                try:
+                    r = await client.post(url, data={"query": QUERY})
+                    r.raise_for_status()
+                    latencies.append(time.perf_counter() - t)
+                except httpx.HTTPError:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+        elapsed = time.perf_counter() - start
+    return latencies, errors, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--threads", type=int, default=int(os.getenv("THREADS", "4")),
+                        help="gunicorn threads per worker (gunicorn.conf.py default)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[4, 16, 64, 256])
+    parser.add_argument("--requests-per-client", type=int, default=4)
+    args = parser.parse_args()
+
+    print(f"{'server':<6} {'clients':>7} {'req/s':>7} {'p50':>8} {'p99':>8} {'concurrent':>11} {'errors':>7}")
+    for kind in ("wsgi", "asgi"):
+        port = free_port()
+        proc = start_server(kind, port, args.threads, args.llm_latency)
+        try:
+            url = f"http://127.0.0.1:{port}/"
+            asyncio.run(run_load(url, 4, 8))  # warm-up
+            base, _, _ = asyncio.run(run_load(url, 1, 5))
+            service = statistics.median(base)
+            for concurrency in args.concurrency:
+                total = concurrency * args.requests_per_client
+                latencies, errors, elapsed = asyncio.run(run_load(url, concurrency, total))
+                if not latencies:
+                    print(f"{kind:<6} {concurrency:>7} {'all failed':>7}")
+                    continue
+                lat = sorted(latencies)
+                rps = len(lat) / elapsed
+                print(f"{kind:<6} {concurrency:>7} {rps:7.1f} {statistics.median(lat) * 1e3:6.0f}ms "
+                      f"{lat[int(0.99 * (len(lat) - 1))] * 1e3:6.0f}ms {rps * service:11.1f} {errors:>7}",
+                      flush=True)
+        finally:
+            proc.terminate()
+            proc.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+SymPy vs. SymEngine for gradient / Hessian / leading-minor computation.
+Parity with plain SymPy is covered by tests/test_backend_parity.py.
+
+    python benchmarks/backend.py                # timings for 2..10 variables
+
+Timings run each backend in a child process (SYMBOLIC_BACKEND=sympy|symengine)
+with a --timeout per size, since plain SymPy minors explode for larger n.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+_TIMING_CHILD = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+import sympy as sp
+from utils.symbolic import backend
+xs = sp.symbols("x1:{n1}")
+r2 = sum(x**2 for x in xs)
+f = r2**2 + sp.exp(xs[0] * xs[-1]) + sum(xs[i] * xs[i + 1]**3 for i in range(len(xs) - 1))
+t = time.perf_counter()
+grad, H = backend.gradient_and_hessian(f, list(xs))
+t_hess = time.perf_counter() - t
+t = time.perf_counter()
+minors = backend.leading_minors(H)
+t_minors = time.perf_counter() - t
+print(json.dumps({{"backend": backend.active_backend(), "hessian": t_hess, "minors": t_minors}}))
+"""
+
+
+def time_backend(name, n, timeout):
+    env = dict(os.environ, SYMBOLIC_BACKEND=name)
+    code = _TIMING_CHILD.format(root=str(ROOT), n1=n + 1)
+    try:
+        out = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True,
+                             text=True, timeout=timeout, check=True)
+    except subprocess.TimeoutExpired:
+        return None
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--max-vars", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'n':>2} {'sympy hess':>11} {'sympy minors':>13} {'se hess':>9} {'se minors':>10}")
+    for n in range(2, args.max_vars + 1):
+        row = [f"{n:>2}"]
+        for name in ("sympy", "symengine"):
+            res = time_backend(name, n, args.timeout)
+            if res is None:
+                row.append(f"{'timeout':>24}")
+            elif res["backend"] != name:
+                row.append(f"{'(not installed)':>24}")
+            else:
+                row.append(f"{res['hessian']:10.4f}s {res['minors']:11.4f}s")
+        print(" ".join(row), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Payload size and time of plain vs. CSE-compressed multivariable convexity output.
+
+For 2-8 variable functions, analyze_multivariable_convexity is run with
+compress=False and compress=True. "payload" is the JSON size of the result dict
+(what the template renders); "time" covers differentiation, minors and LaTeX
+printing. Plain runs that exceed --timeout are reported as such.
+
+    python benchmarks/cse_payload.py --timeout 60
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import sympy as sp  # noqa: E402
+
+from utils.symbolic.solve_convexity import analyze_multivariable_convexity  # noqa: E402
+
+
+def example(n):
+    xs = sp.symbols(f"x1:{n + 1}")
+    r2 = sum(x**2 for x in xs)
+    lin = sum((i + 1) * x for i, x in enumerate(xs))
+    return str(sp.exp(lin / n) + r2**2 + sp.log(1 + r2))
+
+
+def _run(expr_str, compress, out):
+    start = time.perf_counter()
+    result = analyze_multivariable_convexity(expr_str, compress=compress)
+    out.put((time.perf_counter() - start, len(json.dumps(result, ensure_ascii=False)), "error" in result))
+
+
+def measure(expr_str, compress, timeout):
+    out = mp.Queue()
+    p = mp.Process(target=_run, args=(expr_str, compress, out), daemon=True)
+    p.start()
+    p.join(timeout)
+    if p.is_alive():
+        p.terminate()
+        return None
+    return out.get()
+
+
+def fmt(m):
+    if m is None:
+        return f"{'timeout':>10} {'-':>12}"
+    seconds, size, failed = m
+    return f"{seconds:9.2f}s {size:11,d}B" + (" (error)" if failed else "")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--vars", type=int, nargs="+", default=[2, 3, 4, 5, 6, 7, 8])
+    args = parser.parse_args()
+
+    print(f"{'n':>2} {'plain time':>10} {'plain size':>12}   {'cse time':>10} {'cse size':>12}")
+    for n in args.vars:
+        expr_str = example(n)
+        plain = measure(expr_str, False, args.timeout)
+        compressed = measure(expr_str, True, args.timeout)
+        line = f"{n:>2} {fmt(plain)}   {fmt(compressed)}"
+        if plain and compressed:
+            line += f"   size x{plain[1] / compressed[1]:.1f}, time x{plain[0] / compressed[0]:.1f}"
+        print(line, flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Lookup latency of the nearest-neighbour classification index.
+
+    python benchmarks/knn_index.py                  # 1M entries
+    python benchmarks/knn_index.py --size 100000
+
+Featurizes a corpus of generated expressions with SymPy, then grows the index to
+--size entries by jittering those vectors (featurizing 1M expressions would take
+longer than the lookups being measured). Reports featurize time separately from
+exact-signature and brute-force k-NN lookup times, plus save/load time.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import numpy as np  # noqa: E402
+
+from utils.symbolic.knn_index import KNNIndex, featurize  # noqa: E402
+
+TEMPLATES = [
+    ("{a}*x**2 + {b}*x + {c}", "polynomial"),
+    ("{a}*x**3 - {b}*x + {c}", "polynomial"),
+    ("sin({a}*x)*exp(-{b}*x)", "transcendental"),
+    ("log({a}*x + {b})/x", "transcendental"),
+    ("{a}*x**2*y + {b}*y**3 - {c}*x*y", "multivariable"),
+    ("exp({a}*x*y) + {b}*z**2", "multivariable"),
+    ("sqrt({a} + x**2) + {b}*tan(x)", "transcendental"),
+    ("cos(x)**{a} + sin(x)**{b}", "trigonometric"),
+]
+
+
+def corpus(n, rng):
+    for _ in range(n):
+        template, label = rng.choice(TEMPLATES)
+        yield template.format(a=rng.randint(1, 9), b=rng.randint(1, 9), c=rng.randint(1, 9)), label
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return (statistics.median(samples) * 1e3, samples[int(0.99 * (len(samples) - 1))] * 1e3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=1_000_000)
+    parser.add_argument("--seed-exprs", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+    rng = random.Random(0)
+    nprng = np.random.default_rng(0)
+
+    exprs = list(corpus(args.seed_exprs, rng))
+    t = time.perf_counter()
+    vectors = np.stack([featurize(e) for e, _ in exprs])
+    featurize_ms = (time.perf_counter() - t) / len(exprs) * 1e3
+    labels = [label for _, label in exprs]
+
+    index = KNNIndex()
+    t = time.perf_counter()
+    reps = -(-args.size // len(exprs))
+    for _ in range(reps):
+        noisy = vectors + nprng.normal(0, 0.01, vectors.shape).astype(np.float32)
+        noisy /= np.linalg.norm(noisy, axis=1, keepdims=True)
+        index.add_vectors(noisy, labels)
+        if len(index) >= args.size:
+            break
+    build_s = time.perf_counter() - t
+    print(f"entries: {len(index):,}  featurize: {featurize_ms:.2f} ms/expr  build: {build_s:.1f}s")
+
+    queries = list(corpus(args.queries, rng))
+    qvecs = [featurize(e) for e, _ in queries]
+
+    # Exact tier: the unjittered seed vectors are unlikely to collide with jittered
+    # signatures, so register them as seen queries first (min_support times)
+    for _ in range(index.min_support):
+        index.add_vectors(vectors, labels)
+    exact, knn, correct, tiers = [], [], 0, {"exact": 0, "knn": 0, "miss": 0}
+    for (_, label), vec in zip(queries, qvecs):
+        t = time.perf_counter()
+        got, _, tier = index.query_vector(vec)
+        (exact if tier == "exact" else knn).append(time.perf_counter() - t)
+        tiers[tier] += 1
+        correct += got == label
+    for (_, label), vec in zip(queries, qvecs):
+        jittered = vec + nprng.normal(0, 0.02, vec.shape).astype(np.float32)
+        t = time.perf_counter()
+        got, _, tier = index.query_vector(jittered / np.linalg.norm(jittered))
+        knn.append(time.perf_counter() - t)
+        tiers[tier] += 1
+        correct += got == label
+
+    if exact:
+        print("exact lookup   p50 {:.3f} ms  p99 {:.3f} ms".format(*percentiles(exact)))
+    print("k-NN lookup    p50 {:.3f} ms  p99 {:.3f} ms".format(*percentiles(knn)))
+    total = 2 * len(queries)
+    print(f"tiers: {tiers}  accuracy of answered: {correct / max(1, total - tiers['miss']):.3f}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "knn.npz")
+        t = time.perf_counter()
+        index.save(path)
+        save_s = time.perf_counter() - t
+        t = time.perf_counter()
+        KNNIndex.load(path)
+        print(f"save: {save_s:.2f}s  load: {time.perf_counter() - t:.2f}s  "
+              f"size: {os.path.getsize(path) / 1e6:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
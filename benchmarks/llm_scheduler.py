@@ -0,0 +1,80 @@
+"""
+Exercise utils.llm_scheduler against a local fake Gemini client.
+
+Scenarios:
+  tail      heavy-tailed latency, with and without hedging (p50/p99 per request)
+  flaky     random errors, showing retries absorbing them
+  outage    every call fails; the breaker opens and requests degrade fast
+
+    python benchmarks/llm_scheduler.py --requests 400
+"""
+
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils.fake_llm import FakeGeminiClient, heavy_tail_latency  # noqa: E402
+from utils.llm_scheduler import CircuitBreaker, LLMScheduler, LLMUnavailable  # noqa: E402
+
+PROMPTS = ("Classify this math input ...\nInput: x**2\n Only respond with one of: equation",
+           "x**2",
+           "Extract the single, core mathematical expression ...\ninto that exact SymPy expression string:\nx**2")
+
+
+def one_request(scheduler, deadline):
+    """Three calls sharing one budget, as main.index does; returns (seconds, outcome)."""
+    llm = scheduler.for_request(deadline)
+    start = time.perf_counter()
+    outcome = "ok"
+    for prompt in PROMPTS:
+        try:
+            llm.models.generate_content(model="fake", contents=prompt)
+        except LLMUnavailable:
+            outcome = "degraded"
+        except Exception:
+            outcome = "error"
+    return time.perf_counter() - start, outcome
+
+
+def run(name, scheduler, requests, concurrency, deadline):
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda _: one_request(scheduler, deadline), range(requests)))
+    lat = sorted(r[0] for r in results)
+    counts = {k: sum(1 for r in results if r[1] == k) for k in ("ok", "degraded", "error")}
+    p = lambda q: lat[min(len(lat) - 1, int(q / 100 * len(lat)))] * 1000  # noqa: E731
+    print(f"{name:<22} p50 {p(50):7.1f} ms  p95 {p(95):7.1f} ms  p99 {p(99):7.1f} ms  max {lat[-1] * 1000:7.1f} ms  "
+          f"ok {counts['ok']}  degraded {counts['degraded']}  error {counts['error']}  "
+          f"breaker {scheduler.breaker.state}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--deadline", type=float, default=2.0)
+    args = parser.parse_args()
+
+    def tail_client():
+        return FakeGeminiClient(latency=heavy_tail_latency(0.01, 0.5, 0.03, seed=1))
+
+    run("tail / no hedge", LLMScheduler(tail_client(), max_concurrency=128), args.requests, args.concurrency, args.deadline)
+    run("tail / hedge 50ms", LLMScheduler(tail_client(), max_concurrency=128, hedge_after=0.05),
+        args.requests, args.concurrency, args.deadline)
+
+    flaky = FakeGeminiClient(latency=0.01, error_rate=0.2, seed=2)
+    run("flaky / 2 retries", LLMScheduler(flaky, max_concurrency=32, backoff_base=0.01,
+                                          breaker=CircuitBreaker(failure_threshold=50)),
+        args.requests, args.concurrency, args.deadline)
+
+    down = FakeGeminiClient(latency=0.05, error_rate=1.0, seed=3)
+    run("outage / breaker", LLMScheduler(down, max_concurrency=32, backoff_base=0.01,
+                                         breaker=CircuitBreaker(failure_threshold=5, reset_timeout=60)),
+        args.requests, args.concurrency, args.deadline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Plot-data throughput: vectorized evaluation of f, f', f'' versus per-point SymPy.
+
+    python benchmarks/plotting.py
+    python benchmarks/plotting.py --points 1000000 --width 800
+
+For each expression reports plot_data with a --points uniform grid (no
+refinement budget left), the default adaptive run, and the per-point SymPy
+cost extrapolated from a small sample, plus JSON vs. binary payload sizes.
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import numpy as np  # noqa: E402
+import sympy as sp  # noqa: E402
+
+from utils.symbolic.plotting import plot_data, to_columnar, encode_binary  # noqa: E402
+
+CORPUS = [
+    "x**4 - 3*x**2",
+    "exp(-x**2)*sin(3*x)",
+    "tan(x)",
+    "log(x)/x",
+    "sqrt(4 - x**2)",
+    "sin(1/x)",
+    "x**3*exp(-x) + atan(x)",
+]
+
+
+def per_point_sympy(expr_str, n):
+    x = sp.Symbol("x")
+    f = sp.sympify(expr_str)
+    exprs = [f, sp.diff(f, x), sp.diff(f, x, 2)]
+    t = time.perf_counter()
+    for v in np.linspace(-10, 10, n):
+        for e in exprs:
+            e.subs(x, v).evalf()
+    return (time.perf_counter() - t) / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type=int, default=1_000_000)
+    parser.add_argument("--width", type=int, default=800)
+    parser.add_argument("--sympy-sample", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'expression':<26} {'1M grid':>9} {'adaptive':>9} {'evals':>7} {'sympy/pt':>9} "
+          f"{'sympy 1M (est)':>15} {'json':>8} {'binary':>8}")
+    for expr_str in CORPUS:
+        plot_data(expr_str, samples=1000)  # warm lambdify / diff caches
+        t = time.perf_counter()
+        plot_data(expr_str, samples=args.points, max_points=args.points, width=args.width)
+        grid_s = time.perf_counter() - t
+
+        t = time.perf_counter()
+        data = plot_data(expr_str, width=args.width)
+        adaptive_s = time.perf_counter() - t
+
+        per_pt = per_point_sympy(expr_str, args.sympy_sample)
+        json_size = len(json.dumps(to_columnar(data)))
+        bin_size = len(encode_binary(data))
+        print(f"{expr_str:<26} {grid_s * 1e3:7.0f}ms {adaptive_s * 1e3:7.0f}ms {data['stats']['evaluated_points']:>7} "
+              f"{per_pt * 1e3:7.2f}ms {per_pt * args.points:14.0f}s {json_size / 1e3:6.1f}KB {bin_size / 1e3:6.1f}KB",
+              flush=True)
+
+
+if __name__ == "__main__":
+    main()
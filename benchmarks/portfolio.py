@@ -0,0 +1,84 @@
+"""
+Tail latency of portfolio solving vs. the single strategy route_query uses today.
+
+Each corpus entry is solved twice through utils.symbolic.portfolio.portfolio_solve:
+once restricted to the default strategy (same process overhead, one contender)
+and once with the full portfolio. Inputs where the default strategy hangs count
+as --timeout.
+
+    python benchmarks/portfolio.py --timeout 10 --parallel 4
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils.symbolic.portfolio import portfolio_solve  # noqa: E402
+
+DEFAULT_STRATEGY = {"equation": "solve", "system": "solve", "integral": "integrate"}
+
+CORPUS = [
+    ("equation", "x**2 - 4 = 0"),
+    ("equation", "x**3 - 6*x**2 + 11*x - 6 = 0"),
+    ("equation", "x**5 - x + 1 = 0"),
+    ("equation", "x**4 + 2*x**2 - 7 = 3*x"),
+    ("equation", "exp(x) = x + 2"),
+    ("equation", "sin(x) = x/2"),
+    ("equation", "cos(x) + x**2 = 2"),
+    ("equation", "x*log(x) = 3"),
+    ("system", "x + y - 2, x - y - 3"),
+    ("system", "x + y + z - 6, x - y, 2*x - z"),
+    ("system", "x**2 + y**2 - 5, x*y - 2"),
+    ("system", "x**2 - y - 1, y**2 - x - 1"),
+    ("integral", "Integral(x*exp(x), x)"),
+    ("integral", "Integral(sin(x)**3*cos(x)**2, x)"),
+    ("integral", "Integral(1/(x**4 + 1), x)"),
+    ("integral", "Integral(sqrt(1 + x**2), x)"),
+    ("integral", "Integral(x**2*log(x), (x, 1, 2))"),
+    ("integral", "Integral(exp(-x**2)*x**3, (x, 0, oo))"),
+    ("integral", "Integral(1/(sin(x) + cos(x) + 2), x)"),
+]
+
+
+def timed(query_type, expr, strategies, timeout, max_parallel=None):
+    start = time.perf_counter()
+    result = portfolio_solve(query_type, expr, strategies=strategies, timeout=timeout,
+                             max_parallel=max_parallel)
+    return time.perf_counter() - start, result
+
+
+def summary(label, latencies):
+    lat = sorted(latencies)
+    p = lambda q: lat[min(len(lat) - 1, int(round(q / 100 * (len(lat) - 1))))]  # noqa: E731
+    print(f"{label:<10} mean {sum(lat) / len(lat):7.3f}s  p50 {p(50):7.3f}s  p90 {p(90):7.3f}s  "
+          f"p99 {p(99):7.3f}s  max {lat[-1]:7.3f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--timeout", type=float, default=10.0)
+    parser.add_argument("--parallel", type=int, default=None,
+                        help="strategies raced at once (default: CPU count; racing needs >1 core to pay off)")
+    args = parser.parse_args()
+
+    single, racing = [], []
+    print(f"{'type':<9} {'expression':<42} {'single':>8} {'portfolio':>10}  winner")
+    for query_type, expr in CORPUS:
+        t_single, r_single = timed(query_type, expr, [DEFAULT_STRATEGY[query_type]], args.timeout)
+        t_race, r_race = timed(query_type, expr, None, args.timeout, args.parallel)
+        single.append(t_single)
+        racing.append(t_race)
+        mark = "" if "error" not in r_single else " (single failed)"
+        print(f"{query_type:<9} {expr:<42} {t_single:7.3f}s {t_race:9.3f}s  "
+              f"{r_race.get('strategy', 'none')}{mark}")
+
+    print()
+    summary("single", single)
+    summary("portfolio", racing)
+
+
+if __name__ == "__main__":
+    main()
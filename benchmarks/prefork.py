@@ -0,0 +1,125 @@
+"""
+Cold vs. warm first-request latency and per-worker unique memory for pre-forking.
+
+latency: a fresh interpreter imports the app and times its first route_query
+call for each probe query, with and without wsgi.warm_up() beforehand.
+
+memory: the master imports the app (preloaded, warmed, gc.freeze) and forks
+--workers children, or the children import it themselves after forking
+(no preload). Each child serves the probe queries, then reports its unique set
+size (Private_Clean + Private_Dirty from /proc/<pid>/smaps_rollup, Linux only).
+
+    python benchmarks/prefork.py --workers 4
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+PROBES = [
+    ("convexity", "x**4 - 2*x**2 + 1"),
+    ("equation", "x**3 - 6*x**2 + 11*x - 6 = 0"),
+    ("derivative", "x*exp(-x**2)"),
+    ("integral", "Integral(x**2*sin(x), x)"),
+]
+
+_LATENCY_CHILD = """
+import json, os, sys, time
+sys.path.insert(0, {root!r})
+os.environ["SKIP_WARMUP"] = "1"
+t0 = time.perf_counter()
+import wsgi
+from utils.router import route_query
+import_s = time.perf_counter() - t0
+if {warm}:
+    wsgi.warm_up()
+timings = []
+for query_type, expr in {probes!r}:
+    t = time.perf_counter()
+    route_query(query_type, expr, portfolio=False)
+    timings.append(time.perf_counter() - t)
+print(json.dumps({{"import_s": import_s, "timings": timings}}))
+"""
+
+
+def first_request_latency(warm):
+    code = _LATENCY_CHILD.format(root=str(ROOT), warm=warm, probes=PROBES)
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def unique_memory_kb(pid="self"):
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as fh:
+        for line in fh:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(":"):
+                fields[parts[0][:-1]] = int(parts[1])
+    return fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)
+
+
+def _serve_and_report(write_fd, preloaded):
+    if not preloaded:
+        import wsgi  # noqa: F401  (imports and warms inside the worker)
+    from utils.router import route_query
+    for query_type, expr in PROBES:
+        route_query(query_type, expr, portfolio=False)
+    os.write(write_fd, str(unique_memory_kb()).encode())
+    os._exit(0)
+
+
+def worker_memory(workers, preload):
+    if preload:
+        import wsgi  # noqa: F401  (master imports, warms and freezes before forking)
+    results = []
+    for _ in range(workers):
+        r, w = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(r)
+            _serve_and_report(w, preload)
+        os.close(w)
+        results.append((pid, r))
+    sizes = []
+    for pid, r in results:
+        sizes.append(int(os.read(r, 64).decode() or 0))
+        os.close(r)
+        os.waitpid(pid, 0)
+    return sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    for warm in (False, True):
+        res = first_request_latency(warm)
+        label = "warm" if warm else "cold"
+        probes = "  ".join(f"{q}={t * 1000:.0f}ms" for (q, _), t in zip(PROBES, res["timings"]))
+        print(f"{label}: import {res['import_s']:.2f}s, first requests: {probes}, "
+              f"total {sum(res['timings']) * 1000:.0f}ms")
+
+    if not os.path.exists("/proc/self/smaps_rollup"):
+        print("Per-worker unique memory needs /proc/<pid>/smaps_rollup (Linux); skipped.")
+        return
+
+    # Run each mode in its own interpreter so the first does not preload the second.
+    for preload in (False, True):
+        code = (f"import sys; sys.path.insert(0, {str(ROOT)!r}); sys.path.insert(0, {str(ROOT / 'benchmarks')!r});"
+                f"import prefork; print(prefork.worker_memory({args.workers}, {preload}))")
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        sizes = json.loads(out.stdout.strip().splitlines()[-1])
+        label = "preloaded" if preload else "no preload"
+        print(f"{label:<10}: per-worker USS {', '.join(f'{s / 1024:.0f}MB' for s in sizes)} "
+              f"(mean {sum(sizes) / len(sizes) / 1024:.0f}MB)")
+
+
+if __name__ == "__main__":
+    main()
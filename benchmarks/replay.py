@@ -0,0 +1,141 @@
+"""
+Replay captured traffic (TRAFFIC_CAPTURE_PATH log) against the Flask app.
+
+Requests are issued open-loop on the recorded schedule, compressed by --speedup
+(0 sends everything as fast as --concurrency allows). Latency is measured from
+each request's scheduled send time, so queueing inside the driver counts.
+
+In-process (default): main.app is driven through its test client with the
+Gemini client replaced by utils.traffic.ReplayClient.
+
+Against a server (--url): start the server with GEMINI_REPLAY_LOG=<log> so it
+substitutes the recorded LLM responses itself, e.g.
+
+    GEMINI_REPLAY_LOG=traffic.jsonl python main.py
+    python benchmarks/replay.py traffic.jsonl --url http://127.0.0.1:5000/ -c 8 -s 10
+"""
+
+import argparse
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils.traffic import ReplayClient, load_traffic  # noqa: E402
+
+ERROR_MARKER = 'class="error-message"'
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return float("nan")
+    idx = min(len(sorted_values) - 1, max(0, int(round(q / 100 * (len(sorted_values) - 1)))))
+    return sorted_values[idx]
+
+
+def make_in_process_sender(records):
+    import main
+
+    main.init_llm(ReplayClient(records))
+    local = threading.local()
+
+    def send(query):
+        if not hasattr(local, "client"):
+            local.client = main.app.test_client()
+        resp = local.client.post("/", data={"query": query})
+        return resp.status_code, resp.get_data(as_text=True)
+
+    return send
+
+
+def make_http_sender(url, timeout):
+    def send(query):
+        data = urllib.parse.urlencode({"query": query}).encode()
+        try:
+            with urllib.request.urlopen(url, data=data, timeout=timeout) as resp:
+                return resp.status, resp.read().decode("utf-8", "replace")
+        except urllib.error.HTTPError as e:
+            return e.code, ""
+
+    return send
+
+
+def replay(records, send, concurrency=4, speedup=1.0):
+    """
+    Issue every record through `send` and return per-request outcomes as
+    (latency_seconds, ok) tuples plus the wall-clock duration.
+    """
+    outcomes = []
+    lock = threading.Lock()
+    t0_recorded = records[0].get("ts", 0) if records else 0
+
+    def run(rec, scheduled):
+        try:
+            status, body = send(rec["query"])
+            ok = status == 200 and ERROR_MARKER not in body
+        except Exception:
+            ok = False
+        latency = time.perf_counter() - scheduled
+        with lock:
+            outcomes.append((latency, ok))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for rec in records:
+            offset = (rec.get("ts", t0_recorded) - t0_recorded) / speedup if speedup > 0 else 0.0
+            scheduled = start + offset
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(run, rec, scheduled)
+    return outcomes, time.perf_counter() - start
+
+
+def report(outcomes, duration, records):
+    latencies = sorted(lat for lat, _ in outcomes)
+    errors = sum(1 for _, ok in outcomes if not ok)
+    n = len(outcomes)
+    print(f"requests:    {n}")
+    print(f"duration:    {duration:.2f} s")
+    print(f"throughput:  {n / duration if duration else float('nan'):.2f} req/s")
+    for q in (50, 90, 95, 99):
+        print(f"latency p{q}: {percentile(latencies, q) * 1000:.1f} ms")
+    print(f"latency max: {(latencies[-1] if latencies else float('nan')) * 1000:.1f} ms")
+    print(f"error rate:  {errors / n if n else 0:.2%} ({errors}/{n})")
+
+    recorded_errors = sum(1 for r in records if r.get("error"))
+    symbolic = sorted(r.get("timings_ms", {}).get("symbolic", 0.0) for r in records)
+    print(f"recorded error rate:     {recorded_errors / len(records) if records else 0:.2%}")
+    print(f"recorded symbolic p50/p99: {percentile(symbolic, 50):.1f} / {percentile(symbolic, 99):.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("log", help="capture log written via TRAFFIC_CAPTURE_PATH")
+    parser.add_argument("-c", "--concurrency", type=int, default=4)
+    parser.add_argument("-s", "--speedup", type=float, default=1.0,
+                        help="divide recorded inter-arrival gaps by this factor (0 = no pacing)")
+    parser.add_argument("-n", "--limit", type=int, default=None, help="replay only the first N requests")
+    parser.add_argument("--url", default=None, help="replay against a running server instead of in-process")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    args = parser.parse_args()
+
+    records = [r for r in load_traffic(args.log) if r.get("query")]
+    if args.limit:
+        records = records[:args.limit]
+    if not records:
+        sys.exit("No replayable records in log")
+
+    send = make_http_sender(args.url, args.timeout) if args.url else make_in_process_sender(records)
+    outcomes, duration = replay(records, send, args.concurrency, args.speedup)
+    report(outcomes, duration, records)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Follow-up query chains with and without a session workspace.
+
+Each chain asks derivative -> convexity -> derivative (critical points again)
+-> integral about one function, as users do. Every mode runs in a fresh
+interpreter so SymPy's own global cache starts cold in both. Hits are also
+reported per step: the repeated derivative step hits on everything, so the
+convexity and integral steps show what is shared between handlers.
+
+    python benchmarks/workspace.py
+"""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+FUNCTIONS = [
+    "x**3*exp(-x) - 3*x",
+    "log(x**2 + 1) - x/2",
+    "x**4 - 4*x**3 + 2*x",
+    "sin(x)**2 + x/3",
+    "x**2*y + y**3 - 3*x*y",
+    "exp(x*y) + x**2 + y**2",
+]
+
+_CHILD = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+from utils.router import route_query
+from utils.symbolic.workspace import WorkspaceStore
+store = WorkspaceStore()
+timings, hits = {{}}, {{}}
+for i, f in enumerate({functions!r}):
+    ws = store.get(str(i)) if {use_workspace} else None
+    for step, (query_type, expr) in enumerate([("derivative", f), ("convexity", f), ("derivative", f),
+                                               ("integral", f"Integral({{f}}, x)")]):
+        before = store.metrics()
+        t = time.perf_counter()
+        route_query(query_type, expr, portfolio=False, workspace=ws)
+        name = f"{{step + 1}}. {{query_type}}"
+        timings.setdefault(name, []).append(time.perf_counter() - t)
+        after = store.metrics()
+        hits.setdefault(name, [0, 0])
+        hits[name][0] += after["hits"] - before["hits"]
+        hits[name][1] += after["hits"] + after["misses"] - before["hits"] - before["misses"]
+print(json.dumps({{"timings": timings, "hits": hits, "metrics": store.metrics()}}))
+"""
+
+
+def run(use_workspace):
+    code = _CHILD.format(root=str(ROOT), functions=FUNCTIONS, use_workspace=use_workspace)
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    cold, warm = run(False), run(True)
+    print(f"{'step':<16} {'no workspace':>13} {'workspace':>10} {'hits':>9}")
+    for step in cold["timings"]:
+        a, b = sum(cold["timings"][step]), sum(warm["timings"][step])
+        h, n = warm["hits"][step]
+        print(f"{step:<16} {a * 1e3:11.0f}ms {b * 1e3:8.0f}ms {h:>4} / {n:<3}")
+    total_a = sum(map(sum, cold["timings"].values()))
+    total_b = sum(map(sum, warm["timings"].values()))
+    print(f"{'total':<16} {total_a * 1e3:11.0f}ms {total_b * 1e3:8.0f}ms")
+
+    m = warm["metrics"]
+    print(f"\nreuse rate {m['reuse_rate']:.2f} ({m['hits']} hits / {m['misses']} misses, {m['artifacts']} artifacts)")
+    for op, s in m["by_operation"].items():
+        print(f"  {op:<24} {s['hits']:>4} / {s['hits'] + s['misses']:<4} {s['reuse_rate']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
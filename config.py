@@ -1,4 +1,23 @@
 import os
 def configure_genai():
+    # Serve recorded LLM outputs instead of calling Gemini (see benchmarks/replay.py)
+    replay_log = os.getenv("GEMINI_REPLAY_LOG")
+    if replay_log:
+        from utils.traffic import ReplayClient
+        return ReplayClient.from_log(replay_log)
+    # Local fake with fixed latency, for load tests (see benchmarks/asgi_load.py)
+    fake_latency = os.getenv("GEMINI_FAKE_LATENCY_S")
+    if fake_latency:
+        from utils.fake_llm import FakeGeminiClient
+        return FakeGeminiClient(latency=float(fake_latency))
+    import httpx
     from google import genai
-    return genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
\ No newline at end of file
+    from google.genai import types
+    # One client per process: its HTTP pools keep connections alive across
+    # requests, bounded to the scheduler's concurrency
+    pool_size = int(os.getenv("LLM_POOL_SIZE", os.getenv("LLM_MAX_CONCURRENCY", "8")))
+    limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size, keepalive_expiry=60)
+    return genai.Client(
+        api_key=os.getenv("GEMINI_API_KEY"),
+        http_options=types.HttpOptions(client_args={"limits": limits}, async_client_args={"limits": limits}),
+    )
\ No newline at end of file
@@ -0,0 +1,16 @@
+# gunicorn -c gunicorn.conf.py wsgi:app
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+threads = int(os.getenv("THREADS", "4"))
+timeout = int(os.getenv("WORKER_TIMEOUT", "120"))
+
+# Import and warm the app in the master so workers share it copy-on-write
+preload_app = True
+
+
+def post_fork(server, worker):
+    from wsgi import init_worker
+    init_worker()
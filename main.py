@@ -1,35 +1,93 @@
-from flask import Flask, request, render_template
+from flask import Flask, request, render_template, make_response
 from utils.gemini import query_llm, format_llm_output, extract_expression, classify_math_query, LLMError
 from utils.symbolic.solve_convexity import solve_convexity
-from utils.router import route_query
+from utils.router import route_query, local_query_type, normalize_raw_expression, portfolio_enabled, QUERY_TYPES, PORTFOLIO_TYPES
+from utils.http_cache import result_etag, etag_matches, not_modified, json_response, cached_response, cache_control_for, CACHEABLE
+from utils.symbolic.plotting import plot_data, to_columnar, encode_binary
+from utils.llm_scheduler import LLMScheduler, LLMUnavailable
+from utils.traffic import RequestTrace, TrafficRecorder
+from utils.symbolic.guards import MemoryTracker, memory_stage, UnsafeExpression, check_expression
+from utils.symbolic.workspace import WorkspaceStore
+import math
+import secrets
 import time
 import os
 
 app = Flask(__name__)
+traffic_recorder = TrafficRecorder.from_env()
+# Per-process session workspaces; follow-up queries from the same browser reuse artifacts
+workspace_store = WorkspaceStore.from_env()
+WORKSPACE_COOKIE = "workspace"
+client = None
+llm_scheduler = None
+
+
+def init_llm(llm_client):
+    """Install the Gemini client and the scheduler that every request goes through."""
+    global client, llm_scheduler
+    client = llm_client
+    llm_scheduler = LLMScheduler.from_env(llm_client)
+
+
+def get_llm_scheduler():
+    """Scheduler for this process, creating the client on first use (e.g. in a forked worker)."""
+    if llm_scheduler is None:
+        from config import configure_genai
+        init_llm(configure_genai())
+    return llm_scheduler
+
 
 @app.route("/", methods=["GET", "POST"])
 def index():
     explanation = ""
     math_result = {}
     error_message = None
+    session_id = request.cookies.get(WORKSPACE_COOKIE) or secrets.token_urlsafe(16)
     
     if request.method == "POST":
         query = request.form["query"]
+        trace = RequestTrace(query)
+        memory = MemoryTracker()
+        llm = get_llm_scheduler().for_request()
+        degraded_reason = None
         try:
             # Classify the query
-            category = classify_math_query(query, client) 
+            with trace.stage("classify"):
+                try:
+                    category = classify_math_query(query, llm) 
+                except LLMUnavailable as e:
+                    category, degraded_reason = local_query_type(normalize_raw_expression(query)), str(e)
+            trace.category = category
             # Get LLM explanation
-            raw_explanation = query_llm(f"{query}", client)
+            with trace.stage("explain"):
+                try:
+                    raw_explanation = query_llm(f"{query}", llm)
+                except LLMUnavailable as e:
+                    raw_explanation, degraded_reason = "", str(e)
+            trace.explanation = raw_explanation
             explanation = format_llm_output(raw_explanation)
             
             # Step 3: Extract and process mathematical expression
-            expr = extract_expression(query, client)
+            with trace.stage("extract"):
+                try:
+                    expr = extract_expression(query, llm)
+                except LLMUnavailable as e:
+                    expr, degraded_reason = normalize_raw_expression(query), str(e)
+            trace.expression = expr
             print(expr)
-            math_result = route_query(category, expr)
+            with trace.stage("symbolic"), memory.activate(), memory_stage("symbolic"):
+                math_result = route_query(category, expr, workspace=workspace_store.get(session_id))
+
+            # LLM unavailable: serve the symbolic-only result
+            if degraded_reason and not explanation:
+                explanation = f"<em>Explanation unavailable ({degraded_reason}); showing symbolic result only.</em>"
             
             # Check for errors in math_result
             if "error" in math_result:
                 error_message = f"Mathematical Error: {math_result['error']}"
+                if memory.enabled:
+                    error_message += f" (peak memory {memory.peak_bytes / 2**20:.1f} MiB)"
+                print("Symbolic error:", math_result.get("error_type", "error"), memory.summary())
                 math_result = {}
                 
         except LLMError as e:
@@ -38,17 +96,115 @@ def index():
             math_result = {}
         except Exception as e:
             error_message = f"An unexpected error occurred: {str(e)}"
+            print("Unexpected error:", repr(e), memory.summary())
             explanation = ""
             math_result = {}
 
-    return render_template(
+        if traffic_recorder is not None:
+            trace.error = error_message
+            trace.memory = memory.summary()
+            traffic_recorder.record(trace)
+
+    response = make_response(render_template(
         "index.html",
         explanation=explanation,
         math_result=math_result,
         error_message=error_message
-    )
+    ))
+    if request.cookies.get(WORKSPACE_COOKIE) != session_id:
+        response.set_cookie(WORKSPACE_COOKIE, session_id, httponly=True, samesite="Lax")
+    return response
+
+@app.route("/api/solve", methods=["GET"])
+def api_solve():
+    """
+    JSON route_query result for ?type=<query type>&expr=<expression>.
+
+    No LLM is involved, so the response is a pure function of the inputs: the
+    ETag is computed before solving and a matching If-None-Match returns 304.
+    Without type, the expression is classified locally. In portfolio mode, raced
+    query types depend on which strategy finishes first and are never cached.
+    Expressions outside the guards.check_expression allow-list get 400 before
+    anything parses them.
+    """
+    expr = normalize_raw_expression(request.args.get("expr", ""))
+    accept_encoding = request.headers.get("Accept-Encoding", "")
+    try:
+        check_expression(expr)
+    except UnsafeExpression as e:
+        return json_response(e.as_result(), '"invalid"', "no-store", accept_encoding, status=400)
+    query_type = request.args.get("type") or (local_query_type(expr) if expr else "")
+    if not expr or query_type not in QUERY_TYPES:
+        error = {"error": "expr and a type in " + ", ".join(QUERY_TYPES) + " are required"}
+        return json_response(error, '"invalid"', "no-store", accept_encoding, status=400)
+
+    portfolio = portfolio_enabled()
+    raced = portfolio and query_type in PORTFOLIO_TYPES
+    etag = None if raced else result_etag(query_type, expr, portfolio)
+    matched = etag and etag_matches(request.headers.get("If-None-Match", ""), etag)
+    if matched:
+        return not_modified(matched, CACHEABLE)
+
+    memory = MemoryTracker()
+    try:
+        with memory.activate(), memory_stage("symbolic"):
+            result = route_query(query_type, expr, portfolio)
+    except Exception as e:
+        result = {"error": f"An unexpected error occurred: {str(e)}"}
+    if "error" in result:
+        print("Symbolic error:", result.get("error_type", "error"), memory.summary())
+    payload = {"type": query_type, "expression": expr, "result": result}
+    return json_response(payload, etag, "no-store" if raced else cache_control_for(result), accept_encoding,
+                         status=422 if "error" in result else 200)
+
+
+@app.route("/api/plot", methods=["GET"])
+def api_plot():
+    """
+    Plot data for ?expr=<single-variable expression>[&xmin=&xmax=&width=&format=json|binary]:
+    f, f', f'' downsampled to width points, convex/concave intervals, critical and
+    inflection points. Cached like /api/solve, and validated like it.
+    """
+    accept_encoding = request.headers.get("Accept-Encoding", "")
+    expr = normalize_raw_expression(request.args.get("expr", ""))
+    try:
+        check_expression(expr)
+    except UnsafeExpression as e:
+        return json_response(e.as_result(), '"invalid"', "no-store", accept_encoding, status=400)
+    fmt = request.args.get("format", "json")
+    try:
+        x_min = float(request.args.get("xmin", -10))
+        x_max = float(request.args.get("xmax", 10))
+        width = min(max(int(request.args.get("width", 800)), 16), 8192)
+    except ValueError:
+        expr = ""
+    else:
+        if not math.isfinite(x_max - x_min):  # also rejects inf/nan bounds
+            expr = ""
+    if not expr or fmt not in ("json", "binary"):
+        error = {"error": "expr is required; xmin/xmax must be finite numbers, width a number and format json or binary"}
+        return json_response(error, '"invalid"', "no-store", accept_encoding, status=400)
+
+    etag = result_etag(f"plot:{x_min!r}:{x_max!r}:{width}:{fmt}", expr)
+    matched = etag_matches(request.headers.get("If-None-Match", ""), etag)
+    if matched:
+        return not_modified(matched, CACHEABLE)
+
+    data = plot_data(expr, x_min, x_max, width)
+    if data["status"] != "ok":
+        return json_response(data, etag, "no-store", accept_encoding, status=422)
+    if fmt == "binary":
+        return cached_response(encode_binary(data), "application/octet-stream", etag, CACHEABLE, accept_encoding)
+    return json_response(to_columnar(data), etag, CACHEABLE, accept_encoding)
+
+
+@app.route("/api/workspace/metrics", methods=["GET"])
+def api_workspace_metrics():
+    """Session workspace reuse rates for this process."""
+    return json_response(workspace_store.metrics(), '"metrics"', "no-store")
+
 
 if __name__ == "__main__":
     from config import configure_genai
-    client = configure_genai()
+    init_llm(configure_genai())
     app.run(debug=True)
\ No newline at end of file
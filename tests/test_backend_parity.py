@@ -0,0 +1,96 @@
+"""
+Parity of utils.symbolic.backend (SymEngine where supported) with plain SymPy.
+
+Runs against whichever backend is active, so with SymEngine installed it checks
+the fast path and with SYMBOLIC_BACKEND=sympy the fallback.
+
+    python -m pytest tests/test_backend_parity.py
+"""
+
+import random
+import sys
+from pathlib import Path
+
+import pytest
+import sympy as sp
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils.symbolic import backend  # noqa: E402
+
+PARITY = [
+    "x**3 - 3*x + 1",
+    "exp(-x**2)*sin(3*x)",
+    "log(1 + x**2)/x",
+    "sqrt(1 + x**2) + tan(x)",
+    "x**2*y + y**3 - 3*x*y",
+    "exp(x*y) + log(x**2 + y**2 + 1)",
+    "x*y*z + sin(x + y)*cos(z)",
+    "(x + y + z + w)**4 + atan(x*w)",
+    "sinh(x)*cosh(y) - x**5*y**2",
+    "Abs(x) + y**2",            # falls back to SymPy
+    "x**2 + 1.5*y",             # Float: falls back to SymPy
+]
+
+
+def assert_same(a, b, syms, rng):
+    """
+    Spot checks at random rational points; exact expansion only if none of them
+    evaluates (expanding large minors is far slower than evaluating them).
+    """
+    diff = a - b
+    evaluated = 0
+    for _ in range(5):
+        point = {s: sp.Rational(rng.randint(1, 9), rng.randint(1, 9)) for s in syms}
+        try:
+            value = complex(sp.N(diff.subs(point), 30))
+        except (TypeError, ValueError, ZeroDivisionError):
+            continue
+        evaluated += 1
+        assert abs(value) <= 1e-12, f"{a} != {b} at {point}"
+    if not evaluated:
+        assert sp.expand(diff) == 0, f"{a} != {b}"
+
+
+@pytest.fixture
+def rng():
+    return random.Random(0)
+
+
+@pytest.fixture(params=PARITY)
+def case(request):
+    expr = sp.sympify(request.param)
+    return expr, sorted(expr.free_symbols, key=lambda s: s.name)
+
+
+def test_gradient_and_hessian(case, rng):
+    expr, syms = case
+    grad, H = backend.gradient_and_hessian(expr, syms)
+    for g, ref in zip(grad, [sp.diff(expr, v) for v in syms]):
+        assert_same(g, ref, syms, rng)
+    for h, ref in zip(H, sp.hessian(expr, syms)):
+        assert_same(h, ref, syms, rng)
+
+
+def test_leading_minors(case, rng):
+    expr, syms = case
+    ref_H = sp.hessian(expr, syms)
+    _, H = backend.gradient_and_hessian(expr, syms)
+    for k, minor in enumerate(backend.leading_minors(H), start=1):
+        # Division-free reference: bareiss takes minutes on the atan(x*w) case
+        assert_same(minor, ref_H[:k, :k].det(method="berkowitz"), syms, rng)
+
+
+def test_diff_expand_subs(case, rng):
+    expr, syms = case
+    x0 = syms[0]
+    assert_same(backend.diff(expr, x0, x0), sp.diff(expr, x0, x0), syms, rng)
+    assert_same(backend.expand(expr**2), sp.expand(expr**2), syms, rng)
+    assert_same(backend.subs(expr, {x0: 2}), expr.subs(x0, 2), syms, rng)
+
+
+def test_unsupported_constructs_fall_back():
+    x, y = sp.symbols("x y")
+    assert not backend.supports(sp.Abs(x) + y**2)
+    assert not backend.supports(x**2 + sp.Float(1.5) * y)
+    assert not backend.supports(sp.Symbol("p", positive=True) * x)
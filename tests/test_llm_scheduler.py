@@ -0,0 +1,161 @@
+"""
+LLM scheduling policy (utils.llm_scheduler) against the local fake client:
+circuit breaker, overload accounting, shared request deadlines, hedging, and
+main.index degrading to a symbolic-only answer.
+
+    python -m pytest tests/test_llm_scheduler.py
+
+The main.index test needs the app's dependencies (google-genai, torch,
+transformers) and is skipped without them.
+"""
+
+import asyncio
+import random
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils.fake_llm import FakeGeminiClient, heavy_tail_latency  # noqa: E402
+from utils.llm_scheduler import (  # noqa: E402
+    AsyncLLMScheduler, CircuitBreaker, CircuitOpen, DeadlineExceeded, LLMScheduler,
+    QueueFull, QueueTimeout, RetriesExhausted,
+)
+
+
+def ask(view, prompt="x**2"):
+    return view.models.generate_content(model="fake", contents=prompt).text
+
+
+def occupy_slot(scheduler, seconds):
+    """Start a call that holds one concurrency slot for about `seconds`."""
+    thread = threading.Thread(target=ask, args=(scheduler.for_request(),))
+    thread.start()
+    time.sleep(seconds / 4)
+    return thread
+
+
+def test_breaker_opens_after_failures_and_half_opens():
+    client = FakeGeminiClient(error_rate=1.0, seed=0)
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=0.2)
+    scheduler = LLMScheduler(client, max_retries=0, breaker=breaker)
+
+    for _ in range(3):
+        with pytest.raises(RetriesExhausted):
+            ask(scheduler.for_request())
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpen):
+        ask(scheduler.for_request())
+    assert client.calls == 3
+
+    time.sleep(0.25)
+    assert breaker.state == "half_open"
+    client.error_rate = 0.0
+    assert ask(scheduler.for_request())
+    assert breaker.state == "closed"
+
+
+def test_failed_half_open_trial_reopens():
+    client = FakeGeminiClient(error_rate=1.0, seed=0)
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.1)
+    scheduler = LLMScheduler(client, max_retries=0, breaker=breaker)
+    with pytest.raises(RetriesExhausted):
+        ask(scheduler.for_request())
+    time.sleep(0.15)
+    with pytest.raises(RetriesExhausted):
+        ask(scheduler.for_request())  # the trial call
+    assert breaker.state == "open"
+
+
+def test_queue_full_does_not_count_as_failure():
+    breaker = CircuitBreaker(failure_threshold=1)
+    client = FakeGeminiClient(latency=0.4)
+    scheduler = LLMScheduler(client, max_concurrency=1, max_queue=0, breaker=breaker)
+    busy = occupy_slot(scheduler, 0.4)
+    for _ in range(3):
+        with pytest.raises(QueueFull):
+            ask(scheduler.for_request())
+    busy.join()
+    time.sleep(0.05)  # the slot is released by a done-callback, just after the answer
+    assert breaker.state == "closed"
+    assert ask(scheduler.for_request())  # a free slot needs no queue space
+    assert client.calls == 2
+
+
+def test_queue_timeout_does_not_count_as_failure():
+    breaker = CircuitBreaker(failure_threshold=1)
+    scheduler = LLMScheduler(FakeGeminiClient(latency=0.4), max_concurrency=1, max_queue=4, breaker=breaker)
+    busy = occupy_slot(scheduler, 0.4)
+    with pytest.raises(QueueTimeout):
+        ask(scheduler.for_request(deadline=0.05))
+    busy.join()
+    assert breaker.state == "closed"
+
+
+def test_calls_share_one_request_budget():
+    scheduler = LLMScheduler(FakeGeminiClient(latency=0.3), max_retries=0)
+    view = scheduler.for_request(deadline=0.5)
+    start = time.monotonic()
+    assert ask(view)  # 0.3s of the 0.5s budget
+    with pytest.raises(DeadlineExceeded):
+        ask(view)  # cut off when the shared budget runs out, not after a budget of its own
+    assert time.monotonic() - start < 0.6
+    with pytest.raises(DeadlineExceeded):
+        ask(view)  # budget already spent: rejected before reaching the client
+    assert time.monotonic() - start < 0.6
+    assert ask(scheduler.for_request(deadline=0.5))  # a new request gets a fresh budget
+
+
+def _slow_then_fast_seed(tail_prob):
+    # Seed for which heavy_tail_latency draws the tail first and the base second
+    for seed in range(1000):
+        rng = random.Random(seed)
+        if rng.random() < tail_prob <= rng.random():
+            return seed
+    raise AssertionError("no seed found")
+
+
+def test_hedge_wins_under_heavy_tail_latency():
+    latency = heavy_tail_latency(base=0.01, tail=1.0, tail_prob=0.5, seed=_slow_then_fast_seed(0.5))
+    client = FakeGeminiClient(latency=latency)
+    scheduler = LLMScheduler(client, max_concurrency=2, hedge_after=0.05)
+    start = time.monotonic()
+    assert ask(scheduler.for_request())
+    assert time.monotonic() - start < 1.0
+    assert client.calls == 1  # the hedge answered; the original is still sleeping
+
+
+def test_async_hedge_wins_under_heavy_tail_latency():
+    latency = heavy_tail_latency(base=0.01, tail=1.0, tail_prob=0.5, seed=_slow_then_fast_seed(0.5))
+    scheduler = AsyncLLMScheduler(FakeGeminiClient(latency=latency), max_concurrency=2, hedge_after=0.05)
+
+    async def run():
+        view = scheduler.for_request()
+        return await view.aio.models.generate_content(model="fake", contents="x**2")
+
+    start = time.monotonic()
+    assert asyncio.run(run()).text
+    assert time.monotonic() - start < 1.0
+
+
+def test_index_degrades_to_symbolic_result_when_breaker_is_open():
+    for module in ("google.genai", "torch", "transformers"):
+        pytest.importorskip(module)
+    import main
+
+    client = FakeGeminiClient()
+    main.init_llm(client)
+    breaker = main.llm_scheduler.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+
+    response = main.app.test_client().post("/", data={"query": "x**2 - 4 = 0"})
+    html = response.get_data(as_text=True)
+    assert response.status_code == 200
+    assert "Explanation unavailable" in html
+    assert 'class="error-message"' not in html
+    assert "number_of_solution" in html
+    assert client.calls == 0
@@ -0,0 +1,127 @@
+"""
+Local stand-ins for the Gemini client.
+
+FakeGeminiClient exposes the same `client.models.generate_content(...)` and
+`await client.aio.models.generate_content(...)` surfaces that utils.gemini uses,
+so it can be passed anywhere a real client is expected.
+Responses come from a `responder(prompt) -> str` callable.
+
+Helpers:
+  - prompt_kind(prompt): ("classify" | "extract" | "explain", original_query)
+  - default_responder(prompt): cheap canned answers for load tests
+"""
+
+import asyncio
+import random
+import time
+from typing import Callable, Optional, Tuple, Union
+
+_CLASSIFY_PREFIX = "Classify this math input"
+_CLASSIFY_START = "Input: "
+_CLASSIFY_END = "\n Only respond with one of:"
+_EXTRACT_PREFIX = "Extract the single, core mathematical expression"
+_EXTRACT_START = "into that exact SymPy expression string:\n"
+
+
+def prompt_kind(prompt: str) -> Tuple[str, str]:
+    """
+    Recognise which of the utils.gemini prompts this is and recover the user query
+    embedded in it.
+    """
+    if prompt.startswith(_CLASSIFY_PREFIX):
+        start = prompt.find(_CLASSIFY_START) + len(_CLASSIFY_START)
+        end = prompt.rfind(_CLASSIFY_END)
+        return "classify", prompt[start:end if end != -1 else None]
+    if prompt.startswith(_EXTRACT_PREFIX):
+        start = prompt.rfind(_EXTRACT_START)
+        return "extract", prompt[start + len(_EXTRACT_START):] if start != -1 else prompt
+    return "explain", prompt
+
+
+def default_responder(prompt: str) -> str:
+    kind, query = prompt_kind(prompt)
+    if kind == "classify":
+        if "=" in query:
+            return "system" if "," in query else "equation"
+        if "integral" in query.lower() or "integrate" in query.lower():
+            return "integral"
+        if "diff" in query.lower() or "derivative" in query.lower():
+            return "derivative"
+        return "convexity"
+    if kind == "extract":
+        return query.replace("^", "**").strip()
+    return f"Explanation for **{query}**"
+
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class _FakeModels:
+    def __init__(self, owner: "FakeGeminiClient"):
+        self._owner = owner
+
+    def generate_content(self, model=None, config=None, contents=None, **kwargs):
+        return self._owner._respond(contents)
+
+
+class _FakeAsyncModels:
+    def __init__(self, owner: "FakeGeminiClient"):
+        self._owner = owner
+
+    async def generate_content(self, model=None, config=None, contents=None, **kwargs):
+        delay = self._owner._delay()
+        if delay:
+            await asyncio.sleep(delay)
+        return self._owner._answer(contents)
+
+
+class _FakeAio:
+    def __init__(self, owner: "FakeGeminiClient"):
+        self.models = _FakeAsyncModels(owner)
+
+
+class FakeGeminiClient:
+    """
+    Drop-in replacement for genai.Client in tests, replays and load tests.
+
+    Args:
+        responder: callable mapping the prompt to the response text
+        latency: seconds to sleep before answering, or a zero-argument callable
+            returning it (e.g. to inject a heavy tail)
+        error_rate: probability that a call raises instead of answering
+        seed: seed for the error/latency random source
+    """
+
+    def __init__(self, responder: Optional[Callable[[str], str]] = None,
+                 latency: Union[float, Callable[[], float]] = 0.0,
+                 error_rate: float = 0.0, seed: Optional[int] = None):
+        self.responder = responder or default_responder
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.calls = 0
+        self.models = _FakeModels(self)
+        self.aio = _FakeAio(self)
+
+    def _delay(self) -> float:
+        return self.latency() if callable(self.latency) else self.latency
+
+    def _respond(self, prompt) -> FakeResponse:
+        delay = self._delay()
+        if delay:
+            time.sleep(delay)
+        return self._answer(prompt)
+
+    def _answer(self, prompt) -> FakeResponse:
+        self.calls += 1
+        if self.error_rate and self.rng.random() < self.error_rate:
+            raise RuntimeError("Injected fake LLM failure")
+        return FakeResponse(self.responder(str(prompt)))
+
+
+def heavy_tail_latency(base: float, tail: float, tail_prob: float, seed: Optional[int] = None) -> Callable[[], float]:
+    """Latency source: `base` seconds, or `tail` seconds with probability `tail_prob`."""
+    rng = random.Random(seed)
+    return lambda: tail if rng.random() < tail_prob else base
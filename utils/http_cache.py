@@ -0,0 +1,128 @@
+"""
+HTTP caching helpers for the JSON API.
+
+route_query results are a pure function of (query type, expression, solver
+version), so the ETag is computed from those before any solving happens: a
+matching If-None-Match is answered with 304 without touching SymPy, and a
+reverse proxy can keep serving the cached body.
+
+SOLVER_VERSION should be bumped (or set via the environment) whenever solver
+output changes; it also covers the SymPy version, the symbolic backend and
+portfolio mode, which can change the form of results. Raced portfolio results
+depend on timing, so callers send them without an ETag and as no-store.
+
+Gzipped bodies carry their own strong validator ("<hash>-gz"), as strong ETags
+must differ per content-coding; etag_matches accepts either form.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+from typing import Optional
+
+import sympy as sp
+from flask import Response
+
+from utils.symbolic import backend
+from utils.symbolic.guards import UnsafeExpression, check_expression
+
+SOLVER_VERSION = os.getenv("SOLVER_VERSION", "1")
+CACHE_MAX_AGE = int(os.getenv("API_CACHE_MAX_AGE", "86400"))
+GZIP_MIN_BYTES = 512
+GZIP_ETAG_SUFFIX = "-gz"
+CACHEABLE = f"public, max-age={CACHE_MAX_AGE}, immutable"
+
+
+def solver_version(portfolio: bool = False) -> str:
+    return f"{SOLVER_VERSION}/sympy-{sp.__version__}/{backend.active_backend()}{'/portfolio' if portfolio else ''}"
+
+
+def canonical_expression(expr_str: str) -> str:
+    """
+    srepr of each parsed part, so spacing, term order and equivalent spellings
+    (x*x vs x**2) hash the same. Unparseable parts, and any expression that
+    fails check_expression, fall back to the whitespace-stripped string.
+    """
+    try:
+        check_expression(expr_str)
+    except UnsafeExpression:
+        return "".join(expr_str.split())
+    parts = []
+    for part in expr_str.split(","):
+        try:
+            if "=" in part and "==" not in part:
+                lhs, rhs = part.split("=", 1)
+                parts.append(sp.srepr(sp.Eq(sp.sympify(lhs), sp.sympify(rhs), evaluate=False)))
+            else:
+                parts.append(sp.srepr(sp.sympify(part)))
+        except Exception:
+            parts.append("".join(part.split()))
+    return ",".join(parts)
+
+
+def result_etag(query_type: str, expr_str: str, portfolio: bool = False) -> str:
+    key = "\x00".join((query_type, canonical_expression(expr_str), solver_version(portfolio)))
+    return '"' + hashlib.sha256(key.encode()).hexdigest()[:32] + '"'
+
+
+def encoded_etag(etag: str, encoding: Optional[str]) -> str:
+    """ETag of the `encoding` content-coding of a body: '"<hash>"' -> '"<hash>-gz"' for gzip."""
+    return etag[:-1] + GZIP_ETAG_SUFFIX + '"' if encoding == "gzip" else etag
+
+
+def etag_matches(if_none_match: str, etag: str) -> Optional[str]:
+    """
+    The If-None-Match tag that matches `etag` in any content-coding, or None.
+    Weak comparison: W/ prefixes are ignored; * matches (and returns) `etag`.
+    """
+    if not if_none_match:
+        return None
+    for tag in (t.strip() for t in if_none_match.split(",")):
+        if tag == "*":
+            return etag
+        tag = tag[2:] if tag.startswith("W/") else tag
+        if tag in (etag, encoded_etag(etag, "gzip")):
+            return tag
+    return None
+
+
+def not_modified(etag: str, cache_control: str) -> Response:
+    resp = Response(status=304)
+    resp.headers["ETag"] = etag
+    resp.headers["Cache-Control"] = cache_control
+    resp.headers["Vary"] = "Accept-Encoding"
+    return resp
+
+
+def json_response(payload, etag: Optional[str], cache_control: str, accept_encoding: str = "", status: int = 200) -> Response:
+    """JSON body with ETag/Cache-Control, gzipped when the client accepts it and it is worth it."""
+    body = json.dumps(payload, separators=(",", ":"), default=str).encode()
+    return cached_response(body, "application/json", etag, cache_control, accept_encoding, status)
+
+
+def cached_response(body: bytes, mimetype: str, etag: Optional[str], cache_control: str, accept_encoding: str = "",
+                    status: int = 200) -> Response:
+    resp = Response(status=status, mimetype=mimetype)
+    encoding = None
+    if "gzip" in (accept_encoding or "").lower() and len(body) >= GZIP_MIN_BYTES:
+        body = gzip.compress(body, compresslevel=6)
+        encoding = resp.headers["Content-Encoding"] = "gzip"
+    resp.set_data(body)
+    if etag:
+        resp.headers["ETag"] = encoded_etag(etag, encoding)
+    resp.headers["Cache-Control"] = cache_control
+    resp.headers["Vary"] = "Accept-Encoding"
+    return resp
+
+
+def cache_control_for(result) -> str:
+    """
+    Solved results are deterministic and cached publicly. Not cached: errors
+    (timeouts and expression-size limits depend on load and configuration) and
+    numeric answers (nsolve, or anything carrying a "note" that it may be
+    incomplete), which a portfolio only accepts once exact strategies time out.
+    """
+    if "error" in result or result.get("strategy") == "nsolve" or "note" in result:
+        return "no-store"
+    return CACHEABLE
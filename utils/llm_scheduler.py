@@ -0,0 +1,397 @@
+"""
+Scheduling layer around the Gemini client.
+
+LLMScheduler wraps a client and gives every request a ScheduledClient view
+(`scheduler.for_request()`) that can be passed to the utils.gemini helpers in
+place of the raw client. All calls made through one view share a deadline
+budget, and every call goes through:
+
+  - a circuit breaker (fails fast with CircuitOpen while Gemini is unhealthy),
+  - bounded concurrency with a bounded wait queue (QueueFull when saturated),
+  - retries with full-jitter exponential backoff, capped by the deadline,
+  - optional hedging: a duplicate request is sent if the first one has not
+    answered after `hedge_after` seconds, and the first answer wins.
+
+Every failure the caller can degrade from is raised as LLMUnavailable; main.index
+falls back to a symbolic-only result when it sees one.
+
+AsyncLLMScheduler applies the same policy on an event loop (asgi.py): views
+expose `aio.models.generate_content`, concurrency is an asyncio.Semaphore and
+waiting costs no thread.
+
+Configuration via environment (see _SchedulerPolicy.from_env):
+  LLM_DEADLINE_S, LLM_MAX_CONCURRENCY, LLM_MAX_QUEUE, LLM_MAX_RETRIES,
+  LLM_HEDGE_AFTER_S, LLM_BREAKER_FAILURES, LLM_BREAKER_RESET_S
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, Optional
+
+
+class LLMUnavailable(Exception):
+    """The LLM could not answer in time; callers should degrade instead of failing."""
+    pass
+
+
+class DeadlineExceeded(LLMUnavailable):
+    pass
+
+
+class CircuitOpen(LLMUnavailable):
+    pass
+
+
+class QueueFull(LLMUnavailable):
+    pass
+
+
+class QueueTimeout(DeadlineExceeded):
+    pass
+
+
+class RetriesExhausted(LLMUnavailable):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Classic closed -> open -> half-open breaker.
+
+    Opens after `failure_threshold` consecutive failures, rejects calls for
+    `reset_timeout` seconds, then lets a single trial call through. Only calls
+    that reached the client count: local overload (QueueFull, QueueTimeout)
+    says nothing about Gemini's health.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def release(self) -> None:
+        """The allowed call never reached the client; neither success nor failure."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+
+class RequestBudget:
+    """Deadline shared by all LLM calls made for one user request."""
+
+    def __init__(self, seconds: float):
+        self.deadline = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return self.deadline - time.monotonic()
+
+
+class _ScheduledModels:
+    def __init__(self, owner: "ScheduledClient"):
+        self._owner = owner
+
+    def generate_content(self, **kwargs):
+        return self._owner.scheduler.call(self._owner.budget, kwargs)
+
+
+class ScheduledClient:
+    """Per-request client view; exposes the `models.generate_content` surface."""
+
+    def __init__(self, scheduler: "LLMScheduler", budget: RequestBudget):
+        self.scheduler = scheduler
+        self.budget = budget
+        self.models = _ScheduledModels(self)
+
+
+class _SchedulerPolicy:
+    """
+    Failure policy shared by the thread and asyncio schedulers: deadline and
+    breaker admission, breaker accounting and retry backoff. Subclasses supply
+    the concurrency control and the call loop (which only differ in how they
+    wait).
+
+    Args:
+        client: Gemini client (or utils.fake_llm.FakeGeminiClient)
+        deadline: default per-request budget in seconds
+        max_concurrency: in-flight calls to the client, hedges included
+        max_queue: calls allowed to wait for a slot before QueueFull
+        max_retries: extra attempts after the first failure
+        backoff_base, backoff_max: full-jitter backoff parameters (seconds)
+        hedge_after: send a duplicate after this many seconds (None disables)
+        breaker: CircuitBreaker instance
+    """
+
+    def __init__(self, client, deadline: float = 20.0, max_concurrency: int = 8, max_queue: int = 64,
+                 max_retries: int = 2, backoff_base: float = 0.25, backoff_max: float = 2.0,
+                 hedge_after: Optional[float] = None, breaker: Optional[CircuitBreaker] = None):
+        self.client = client
+        self.deadline = deadline
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_after = hedge_after
+        self.breaker = breaker or CircuitBreaker()
+        self._queued = 0
+
+    @classmethod
+    def from_env(cls, client):
+        hedge = os.getenv("LLM_HEDGE_AFTER_S")
+        return cls(
+            client,
+            deadline=float(os.getenv("LLM_DEADLINE_S", "20")),
+            max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "8")),
+            max_queue=int(os.getenv("LLM_MAX_QUEUE", "64")),
+            max_retries=int(os.getenv("LLM_MAX_RETRIES", "2")),
+            hedge_after=float(hedge) if hedge else None,
+            breaker=CircuitBreaker(
+                failure_threshold=int(os.getenv("LLM_BREAKER_FAILURES", "5")),
+                reset_timeout=float(os.getenv("LLM_BREAKER_RESET_S", "30")),
+            ),
+        )
+
+    def _admit(self, budget: RequestBudget) -> None:
+        """Raise instead of attempting a call when the budget is spent or the circuit is open."""
+        if budget.remaining() <= 0:
+            raise DeadlineExceeded("LLM deadline exceeded")
+        if not self.breaker.allow():
+            raise CircuitOpen("LLM circuit breaker is open")
+
+    def _backoff(self, error: Exception, attempt: int, budget: RequestBudget) -> float:
+        """
+        Account a failed attempt with the breaker and return the delay before
+        the next one, or raise when the call should not be retried.
+        """
+        if isinstance(error, (QueueFull, QueueTimeout)):
+            # Local overload, not a backend failure
+            self.breaker.release()
+            raise error
+        self.breaker.record_failure()
+        if isinstance(error, DeadlineExceeded):
+            raise error
+        if attempt >= self.max_retries:
+            raise RetriesExhausted(f"LLM failed after {attempt + 1} attempts: {error}") from error
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt + 1)))
+        if delay >= budget.remaining():
+            raise DeadlineExceeded("LLM deadline exceeded while backing off")
+        return delay
+
+
+class LLMScheduler(_SchedulerPolicy):
+    """
+    Thread-based scheduler (main.py). Takes the _SchedulerPolicy arguments;
+    calls run on a pool of max_concurrency threads.
+    """
+
+    def __init__(self, client, max_concurrency: int = 8, **kwargs):
+        super().__init__(client, max_concurrency=max_concurrency, **kwargs)
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._queue_lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="llm")
+
+    def for_request(self, deadline: Optional[float] = None) -> ScheduledClient:
+        return ScheduledClient(self, RequestBudget(deadline if deadline is not None else self.deadline))
+
+    def call(self, budget: RequestBudget, kwargs: Dict[str, Any]):
+        """
+        Run `client.models.generate_content(**kwargs)` under the scheduling policy.
+
+        Raises:
+            LLMUnavailable: deadline spent, circuit open, queue full or retries exhausted
+        """
+        attempt = 0
+        while True:
+            self._admit(budget)
+            try:
+                response = self._attempt(kwargs, budget)
+            except Exception as e:
+                time.sleep(self._backoff(e, attempt, budget))
+                attempt += 1
+                continue
+            self.breaker.record_success()
+            return response
+
+    def _acquire(self, timeout: float) -> None:
+        if self._slots.acquire(blocking=False):
+            # A free slot is taken without waiting, so it never counts as queued
+            return
+        with self._queue_lock:
+            if self._queued >= self.max_queue:
+                raise QueueFull("LLM request queue is full")
+            self._queued += 1
+        try:
+            if not self._slots.acquire(timeout=max(timeout, 0)):
+                raise QueueTimeout("LLM deadline exceeded while queued")
+        finally:
+            with self._queue_lock:
+                self._queued -= 1
+
+    def _submit(self, kwargs):
+        future = self._pool.submit(self.client.models.generate_content, **kwargs)
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def _attempt(self, kwargs, budget: RequestBudget):
+        self._acquire(budget.remaining())
+        pending = {self._submit(kwargs)}
+
+        if self.hedge_after is not None and self.hedge_after < budget.remaining():
+            done, pending = wait(pending, timeout=self.hedge_after)
+            if done:
+                return done.pop().result()
+            # Hedge only if a slot is free right now; never queue behind ourselves.
+            if self._slots.acquire(blocking=False):
+                pending.add(self._submit(kwargs))
+
+        error = None
+        while pending:
+            done, pending = wait(pending, timeout=max(budget.remaining(), 0), return_when=FIRST_COMPLETED)
+            if not done:
+                raise DeadlineExceeded("LLM deadline exceeded waiting for response")
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+        raise error
+
+
+class _AsyncScheduledModels:
+    def __init__(self, owner: "AsyncScheduledClient"):
+        self._owner = owner
+
+    async def generate_content(self, **kwargs):
+        return await self._owner.scheduler.call(self._owner.budget, kwargs)
+
+
+class _AsyncScheduledAio:
+    def __init__(self, owner: "AsyncScheduledClient"):
+        self.models = _AsyncScheduledModels(owner)
+
+
+class AsyncScheduledClient:
+    """Per-request client view; exposes the `aio.models.generate_content` surface."""
+
+    def __init__(self, scheduler: "AsyncLLMScheduler", budget: RequestBudget):
+        self.scheduler = scheduler
+        self.budget = budget
+        self.aio = _AsyncScheduledAio(self)
+
+
+class AsyncLLMScheduler(_SchedulerPolicy):
+    """
+    Scheduler for asyncio (asgi.py): same arguments, environment and failure
+    policy as LLMScheduler, but calls go through
+    `client.aio.models.generate_content` and are awaited, and no threads are
+    used. Must be used from a single event loop.
+    """
+
+    def __init__(self, client, max_concurrency: int = 8, **kwargs):
+        super().__init__(client, max_concurrency=max_concurrency, **kwargs)
+        self._slots = asyncio.Semaphore(max_concurrency)
+
+    def for_request(self, deadline: Optional[float] = None) -> AsyncScheduledClient:
+        return AsyncScheduledClient(self, RequestBudget(deadline if deadline is not None else self.deadline))
+
+    async def call(self, budget: RequestBudget, kwargs: Dict[str, Any]):
+        attempt = 0
+        while True:
+            self._admit(budget)
+            try:
+                response = await self._attempt(kwargs, budget)
+            except Exception as e:
+                await asyncio.sleep(self._backoff(e, attempt, budget))
+                attempt += 1
+                continue
+            self.breaker.record_success()
+            return response
+
+    async def _acquire(self, timeout: float) -> None:
+        if not self._slots.locked():
+            # A free slot is taken without suspending, so it never counts as queued
+            await self._slots.acquire()
+            return
+        if self._queued >= self.max_queue:
+            raise QueueFull("LLM request queue is full")
+        self._queued += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=max(timeout, 0))
+        except asyncio.TimeoutError:
+            raise QueueTimeout("LLM deadline exceeded while queued")
+        finally:
+            self._queued -= 1
+
+    def _submit(self, kwargs) -> asyncio.Task:
+        task = asyncio.ensure_future(self.client.aio.models.generate_content(**kwargs))
+        task.add_done_callback(lambda _: self._slots.release())
+        return task
+
+    async def _attempt(self, kwargs, budget: RequestBudget):
+        await self._acquire(budget.remaining())
+        pending = {self._submit(kwargs)}
+        try:
+            if self.hedge_after is not None and self.hedge_after < budget.remaining():
+                done, pending = await asyncio.wait(pending, timeout=self.hedge_after)
+                if done:
+                    return done.pop().result()
+                # Hedge only if a slot is free right now; never queue behind ourselves.
+                if not self._slots.locked():
+                    await self._slots.acquire()
+                    pending.add(self._submit(kwargs))
+
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, timeout=max(budget.remaining(), 0),
+                                                   return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    raise DeadlineExceeded("LLM deadline exceeded waiting for response")
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            # Unlike threads, losing hedges and timed-out calls can be cancelled
+            for task in pending:
+                task.cancel()
@@ -1,19 +1,24 @@
 from utils.symbolic import *
+from utils.symbolic.portfolio import portfolio_solve
+from utils.symbolic.guards import UnsafeExpression, check_expression
+from utils.symbolic.handlers import parse_input
 from sympy import sympify
 from sympy.parsing.sympy_parser import parse_expr
 import sympy as sp
+import os
 
 
 from sympy import sympify
 
-def route_problem(expr_str):
-    expr = sympify(expr_str)
+def route_problem(expr_str, workspace=None):
+    # Parsed as the convexity handlers parse it, and found again by them
+    expr = parse_input(expr_str, workspace)
     free_vars = expr.free_symbols
 
     if len(free_vars) > 1:
-        return analyze_multivariable_convexity(expr_str)
+        return analyze_multivariable_convexity(expr_str, workspace=workspace)
     else:
-        return solve_convexity(expr_str)
+        return solve_convexity(expr_str, workspace=workspace)
     
 from sympy import sympify, Eq, sin, symbols
 from sympy.core.relational import Relational
@@ -67,12 +72,37 @@ def is_nonlinear_system(equation_strs):
         return True
 
 
-def route_query(query_type, expr_str):
+PORTFOLIO_TYPES = ("equation", "system", "integral")
+QUERY_TYPES = ("convexity", "equation", "system", "derivative", "integral")
+
+
+def portfolio_enabled():
+    return os.getenv("PORTFOLIO_SOLVING", "").lower() in ("1", "true", "yes")
+
+
+def route_query(query_type, expr_str, portfolio=None, workspace=None):
     """
     Routes the symbolic expression to the correct SymPy validator based on query_type.
+
+    With portfolio=True (default: the PORTFOLIO_SOLVING environment flag), equation,
+    system and integral queries race several strategies instead (see utils.symbolic.portfolio).
+
+    workspace: session Workspace (utils.symbolic.workspace) that convexity, derivative
+    and integral queries reuse parsed expressions and artifacts from.
+
+    Expressions that fail guards.check_expression are rejected before any parsing.
     """
+    try:
+        check_expression(expr_str)
+    except UnsafeExpression as e:
+        return e.as_result()
+    if portfolio is None:
+        portfolio = portfolio_enabled()
+    if portfolio and query_type in PORTFOLIO_TYPES:
+        return portfolio_solve(query_type, expr_str)
+
     if query_type == "convexity":
-        return route_problem(expr_str)
+        return route_problem(expr_str, workspace)
     elif query_type == "equation":
         if is_nonlinear_equation(expr_str):
             return solve_nonlinear_equation(expr_str)
@@ -86,10 +116,48 @@ def route_query(query_type, expr_str):
         else:
             return solve_system_of_equations(expr_str)
     elif query_type == 'derivative':
-        return handle_derivative(expr_str)
+        return handle_derivative(expr_str, workspace=workspace)
     elif query_type == 'integral':
-        return handle_integral(expr_str)
+        return handle_integral(expr_str, workspace=workspace)
     else:
         return {"error": f"Unsupported query type: {query_type}"}
-    
 
+
+# Labels produced by utils.symbolic.ml_classifier.classify -> route_query types
+LABEL_TO_QUERY_TYPE = {
+    "equation_linear": "equation",
+    "equation_nonlinear": "equation",
+    "system_linear": "system",
+    "system_nonlinear": "system",
+    "derivative": "derivative",
+    "integral": "integral",
+    "convexity_problem": "convexity",
+}
+
+
+def normalize_raw_expression(query):
+    """
+    Best-effort SymPy string from raw user input, used when the LLM cannot extract one.
+    """
+    return query.strip().rstrip("?.").replace("^", "**")
+
+
+def local_query_type(expr_str):
+    """
+    Classify an expression without the LLM (deterministic rules, then the ML model).
+    Anything unrecognised is treated as a function to analyse for convexity.
+    Raises guards.UnsafeExpression for expressions that fail check_expression.
+    """
+    from utils.symbolic.ml_classifier import classify
+
+    check_expression(expr_str)
+    parts = []
+    for part in expr_str.split(','):
+        if '=' in part and '==' not in part:
+            lhs, rhs = part.split('=', 1)
+            part = f"Eq({lhs.strip()}, {rhs.strip()})"
+        parts.append(part.strip())
+    candidate = f"({', '.join(parts)},)" if len(parts) > 1 else parts[0]
+
+    label, _, _ = classify(candidate)
+    return LABEL_TO_QUERY_TYPE.get(label, "convexity")
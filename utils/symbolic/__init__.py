@@ -6,4 +6,12 @@ from .solve_linear_system import solve_system_of_equations
 from .non_linear_system import solve_nonlinear_system
 from . import *
 from .handlers import handle_derivative, handle_integral, handle_expression
-from .ml_classifier import classify
\ No newline at end of file
+
+
+def __getattr__(name):
+    # The classifier loads a transformer model on import; defer it to first use so
+    # processes that only solve (portfolio strategies) never load it
+    if name == "classify":
+        from .ml_classifier import classify
+        return classify
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
@@ -0,0 +1,152 @@
+"""
+Symbolic backend for the hot differentiation / expansion / substitution /
+determinant operations.
+
+SymEngine (C++ core, `pip install symengine`) is used when it is installed and
+the expression only contains constructs it handles identically to SymPy;
+everything else falls back to SymPy transparently. All functions take and
+return SymPy objects, so solvers and printers downstream are unaffected.
+
+SYMBOLIC_BACKEND selects the backend: "auto" (default), "sympy" or "symengine"
+("symengine" still falls back per expression when it has to).
+"""
+
+import os
+from functools import lru_cache
+from typing import Dict, List, Sequence, Tuple
+
+import sympy as sp
+
+try:
+    import symengine as se
+except ImportError:
+    se = None
+
+BACKEND = os.getenv("SYMBOLIC_BACKEND", "auto").lower()
+
+# Function heads SymEngine differentiates and converts back exactly like SymPy
+_SUPPORTED_FUNCTIONS = (
+    sp.exp, sp.log, sp.sin, sp.cos, sp.tan, sp.cot, sp.sec, sp.csc,
+    sp.asin, sp.acos, sp.atan, sp.sinh, sp.cosh, sp.tanh,
+)
+
+
+def active_backend() -> str:
+    return "symengine" if se is not None and BACKEND != "sympy" else "sympy"
+
+
+def supports(*exprs) -> bool:
+    """
+    True if every expression can take the SymEngine path: plain symbols (no
+    assumptions, which SymEngine would drop), exact numbers (no Floats, whose
+    precision SymEngine would change) and whitelisted functions.
+
+    The tree walk is cached per expression, so loops that call diff/subs on the
+    same expression repeatedly pay for it once.
+    """
+    if active_backend() != "symengine":
+        return False
+    for expr in exprs:
+        if isinstance(expr, sp.MatrixBase):
+            if not supports(*expr):
+                return False
+            continue
+        if not isinstance(expr, sp.Basic) or not _supports_expr(expr):
+            return False
+    return True
+
+
+# Keyed by structural equality; SymPy >= 1.13 compares Float and Rational unequal,
+# so e.g. x + 2.0 never hits the entry for x + 2
+@lru_cache(maxsize=1024)
+def _supports_expr(expr: sp.Basic) -> bool:
+    for sym in expr.free_symbols:
+        if not isinstance(sym, sp.Symbol) or sym.assumptions0 != {"commutative": True}:
+            return False
+    for node in sp.preorder_traversal(expr):
+        if node.is_Atom:
+            if not (node.is_Symbol or node.is_Rational or node in (sp.pi, sp.E, sp.I)):
+                return False
+        elif isinstance(node, sp.Function):
+            if not isinstance(node, _SUPPORTED_FUNCTIONS):
+                return False
+        elif not isinstance(node, (sp.Add, sp.Mul, sp.Pow)):
+            return False
+    return True
+
+
+def _to_se(expr):
+    return se.sympify(expr)
+
+
+def _to_sp(obj) -> sp.Basic:
+    return sp.sympify(obj)
+
+
+def diff(expr, *symbols) -> sp.Basic:
+    if supports(expr):
+        try:
+            return _to_sp(se.diff(_to_se(expr), *[_to_se(s) for s in symbols]))
+        except Exception:
+            pass
+    return sp.diff(expr, *symbols)
+
+
+def expand(expr) -> sp.Basic:
+    if supports(expr):
+        try:
+            return _to_sp(se.expand(_to_se(expr)))
+        except Exception:
+            pass
+    return sp.expand(expr)
+
+
+def subs(expr, mapping: Dict) -> sp.Basic:
+    if supports(expr, *mapping.keys(), *mapping.values()):
+        try:
+            return _to_sp(_to_se(expr).subs({_to_se(k): _to_se(v) for k, v in mapping.items()}))
+        except Exception:
+            pass
+    return expr.subs(mapping)
+
+
+def gradient_and_hessian(expr, variables: Sequence[sp.Symbol]) -> Tuple[List[sp.Basic], sp.Matrix]:
+    """
+    Gradient list and Hessian matrix, converting to and from SymEngine only once.
+    """
+    n = len(variables)
+    if supports(expr):
+        try:
+            e = _to_se(expr)
+            vs = [_to_se(v) for v in variables]
+            grad = [se.diff(e, v) for v in vs]
+            H = sp.zeros(n, n)
+            for i in range(n):
+                for j in range(i, n):
+                    H[i, j] = H[j, i] = _to_sp(se.diff(grad[i], vs[j]))
+            return [_to_sp(g) for g in grad], H
+        except Exception:
+            pass
+    grad = [sp.diff(expr, v) for v in variables]
+    return grad, sp.Matrix([[sp.diff(g, v) for v in variables] for g in grad])
+
+
+def det(matrix: sp.Matrix, method: str = "bareiss") -> sp.Basic:
+    if supports(matrix):
+        try:
+            return _to_sp(se.DenseMatrix(matrix.tolist()).det())
+        except Exception:
+            pass
+    return matrix.det(method=method)
+
+
+def leading_minors(matrix: sp.Matrix, method: str = "bareiss") -> List[sp.Basic]:
+    """Determinants of the leading k x k blocks, k = 1..n."""
+    n = matrix.shape[0]
+    if supports(matrix):
+        try:
+            M = se.DenseMatrix(matrix.tolist())
+            return [_to_sp(M[:k, :k].det()) for k in range(1, n + 1)]
+        except Exception:
+            pass
+    return [matrix[:k, :k].det(method=method) for k in range(1, n + 1)]
@@ -0,0 +1,107 @@
+"""
+Common-subexpression-compressed output for gradients, Hessians and minors.
+
+For functions of many variables the Hessian entries and leading principal minors
+share most of their structure, and printing each one expanded makes output size
+and MathJax render time grow explosively. This module returns them as a bundle:
+
+  {
+    "subexpressions": ["S_{0} = ...", "S_{1} = ...", ...],   # shared table, in order
+    "gradient_latex": [...], "hessian_latex": "...", "minors_latex": [...]
+  }
+
+where the final expressions refer to the S_k symbols of the table.
+
+Minors are computed over the compressed Hessian (entries replaced by table
+symbols), so the determinant expansion never sees the full expressions.
+
+Swell guard: should_compress() switches to the bundle automatically when the
+total count_ops of the plain expressions exceeds CSE_OPS_THRESHOLD (env var,
+default 200).
+"""
+
+import os
+from typing import Any, Dict, List, Optional, Sequence
+
+import sympy as sp
+
+from . import backend
+
+CSE_OPS_THRESHOLD = int(os.getenv("CSE_OPS_THRESHOLD", "200"))
+
+
+def total_ops(exprs: Sequence[sp.Basic]) -> int:
+    return sum(sp.count_ops(e) for e in exprs)
+
+
+def should_compress(exprs: Sequence[sp.Basic], compress: Optional[bool] = None,
+                    threshold: Optional[int] = None) -> bool:
+    """
+    compress=True/False forces the choice; None applies the swell guard.
+    """
+    if compress is not None:
+        return compress
+    limit = CSE_OPS_THRESHOLD if threshold is None else threshold
+    return total_ops(exprs) > limit
+
+
+def _table_symbols(taken):
+    return sp.numbered_symbols("S_", exclude=taken)
+
+
+def compressed_derivatives(expr: sp.Expr, variables: List[sp.Symbol],
+                           gradient: Optional[List[sp.Expr]] = None,
+                           hessian: Optional[sp.Matrix] = None) -> Dict[str, Any]:
+    """
+    Gradient, Hessian and leading principal minors of `expr` as a CSE bundle.
+
+    Returns the latex bundle plus the SymPy pieces ("replacements", "gradient",
+    "hessian", "minors") for callers that want to keep working with them.
+    Pass `gradient` and `hessian` if they have already been computed (e.g. by
+    backend.gradient_and_hessian); otherwise they are differentiated here.
+    """
+    n = len(variables)
+    if gradient is None or hessian is None:
+        gradient, hessian = backend.gradient_and_hessian(expr, variables)
+    entries = [hessian[i, j] for i in range(n) for j in range(i, n)]
+
+    symbols = _table_symbols(expr.free_symbols)
+    replacements, reduced = sp.cse(gradient + entries, symbols=symbols, order="none")
+    red_grad, red_entries = reduced[:n], reduced[n:]
+
+    # Symmetric Hessian from the upper triangle; replace every non-trivial
+    # entry by a table symbol so the determinants stay small.
+    H = sp.zeros(n, n)
+    it = iter(red_entries)
+    for i in range(n):
+        for j in range(i, n):
+            entry = next(it)
+            if entry.is_Atom or sp.count_ops(entry) <= 1:
+                H[i, j] = H[j, i] = entry
+            else:
+                sym = next(symbols)
+                replacements.append((sym, entry))
+                H[i, j] = H[j, i] = sym
+
+    minors = backend.leading_minors(H, method="berkowitz")
+    minor_repl, minors = sp.cse(minors, symbols=symbols, order="none")
+    replacements.extend(minor_repl)
+
+    return {
+        "subexpressions": [f"{sp.latex(s)} = {sp.latex(e)}" for s, e in replacements],
+        "gradient_latex": [sp.latex(g) for g in red_grad],
+        "hessian_latex": sp.latex(H),
+        "minors_latex": [sp.latex(m) for m in minors],
+        "replacements": replacements,
+        "gradient": red_grad,
+        "hessian": H,
+        "minors": minors,
+    }
+
+
+def expand_bundle(replacements, exprs):
+    """Substitute the shared table back into `exprs` (for checks and tests of equivalence)."""
+    out = list(exprs)
+    for sym, sub in reversed(replacements):
+        out = [e.subs(sym, sub) if isinstance(e, sp.Basic) else e for e in out]
+    return out
@@ -0,0 +1,220 @@
+"""
+Per-request memory accounting and expression-swell guard for the symbolic solvers.
+
+Memory:
+  - MemoryTracker records the peak traced allocation of a request and of each
+    solver stage. It is activated per request (`with tracker.activate():`) and
+    solver code marks stages with `with memory_stage("simplify"):`, which is a
+    no-op when no tracker is active.
+  - Tracking uses tracemalloc and is off unless TRACK_MEMORY=1, because tracing
+    slows SymPy down noticeably. tracemalloc is process-wide, so with a threaded
+    server concurrent requests inflate each other's numbers; use one request per
+    process (or thread count 1) when measuring.
+
+Swell guard:
+  - check_size(obj, stage) raises ExpressionTooLarge when count_ops of an
+    intermediate result exceeds MAX_EXPR_OPS (default 50000). Solvers catch it
+    and return ExpressionTooLarge.as_result(), a structured error dict that flows
+    through the normal {"error": ...} path in main.index.
+
+Input guard:
+  - sympify/parse_expr run eval on their input, so user-supplied text is passed
+    to check_expression first. It accepts only numbers, operators, brackets,
+    known SymPy function names and constants (SAFE_NAMES) and plain symbol names
+    (no dunders, Python builtins or keywords, or other SymPy names), and raises
+    UnsafeExpression otherwise: no attribute access, quotes, lambda or calls to
+    anything but SymPy functions.
+"""
+
+import builtins
+import contextvars
+import keyword
+import os
+import re
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+import sympy as sp
+import sympy.functions
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+MAX_EXPR_OPS = int(os.getenv("MAX_EXPR_OPS", "50000"))
+
+
+class ExpressionTooLarge(Exception):
+    """An intermediate result grew past the configured operation-count limit."""
+
+    def __init__(self, stage: str, size: int, limit: int):
+        self.stage = stage
+        self.size = size
+        self.limit = limit
+        super().__init__(f"Expression too large after {stage} ({size} operations, limit {limit})")
+
+    def as_result(self) -> Dict[str, Any]:
+        return {
+            "status": "error",
+            "error": str(self),
+            "error_type": "expression_too_large",
+            "stage": self.stage,
+            "size": self.size,
+            "limit": self.limit,
+        }
+
+
+def expression_size(obj) -> int:
+    """count_ops of a SymPy object, summed over containers (lists, dicts, matrices)."""
+    if isinstance(obj, sp.MatrixBase):
+        return sum(expression_size(e) for e in obj)
+    if isinstance(obj, dict):
+        return sum(expression_size(k) + expression_size(v) for k, v in obj.items())
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return sum(expression_size(e) for e in obj)
+    if isinstance(obj, sp.Basic):
+        return int(sp.count_ops(obj))
+    return 0
+
+
+def check_size(obj, stage: str, limit: Optional[int] = None):
+    """
+    Raise ExpressionTooLarge if `obj` exceeds the limit; return `obj` otherwise.
+    """
+    limit = MAX_EXPR_OPS if limit is None else limit
+    size = expression_size(obj)
+    if size > limit:
+        raise ExpressionTooLarge(stage, size, limit)
+    return obj
+
+
+# Elementary and special functions, plus the constructs and constants queries use
+SAFE_NAMES = frozenset(sympy.functions.__all__) | {
+    "Eq", "Ne", "Lt", "Le", "Gt", "Ge", "Derivative", "Integral", "Sum", "Product", "Limit",
+    "diff", "integrate", "limit", "Rational", "pi", "E", "I", "oo", "zoo", "nan",
+}
+
+_EXPRESSION_TOKEN = re.compile(r"""
+    (?P<space>[ \t]+)
+  | (?P<number>(?:\d+(?:\.\d+|\.(?![A-Za-z_]))?|\.\d+)(?:[eE][+-]?\d+)?)
+  | (?P<name>[A-Za-z][A-Za-z0-9_]*)
+  | (?P<op>[-+*/^()\[\],=<>!])
+""", re.VERBOSE)
+
+
+class UnsafeExpression(ValueError):
+    """Expression text outside the check_expression allow-list."""
+
+    def __init__(self, reason: str):
+        self.reason = reason
+        super().__init__(f"Unsupported expression: {reason}")
+
+    def as_result(self) -> Dict[str, Any]:
+        return {"status": "error", "error": str(self), "error_type": "invalid_expression"}
+
+
+def _is_symbol_name(name: str) -> bool:
+    return ("__" not in name and not keyword.iskeyword(name)
+            and not hasattr(builtins, name) and not hasattr(sp, name))
+
+
+def check_expression(expr_str: str) -> str:
+    """
+    Raise UnsafeExpression unless `expr_str` is safe to hand to sympify/parse_expr;
+    return it otherwise.
+    """
+    pos = 0
+    while pos < len(expr_str):
+        m = _EXPRESSION_TOKEN.match(expr_str, pos)
+        if m is None:
+            raise UnsafeExpression(f"unexpected {expr_str[pos]!r} at position {pos}")
+        name = m.group("name")
+        if name and name not in SAFE_NAMES and not _is_symbol_name(name):
+            raise UnsafeExpression(f"unknown name {name!r}")
+        pos = m.end()
+    return expr_str
+
+
+_active_tracker: contextvars.ContextVar = contextvars.ContextVar("memory_tracker", default=None)
+
+
+class MemoryTracker:
+    """
+    Peak allocated memory (bytes) for one request and each of its stages.
+    """
+
+    def __init__(self, enabled: Optional[bool] = None):
+        if enabled is None:
+            enabled = os.getenv("TRACK_MEMORY", "").lower() in ("1", "true", "yes")
+        self.enabled = enabled
+        self.peak_bytes = 0
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self._base = 0
+        self._open = []
+
+    @contextmanager
+    def activate(self):
+        if self.enabled and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        token = _active_tracker.set(self)
+        if self.enabled:
+            tracemalloc.reset_peak()
+            self._base = tracemalloc.get_traced_memory()[0]
+        try:
+            yield self
+        finally:
+            _active_tracker.reset(token)
+            if self.enabled:
+                self.peak_bytes = max(self.peak_bytes, tracemalloc.get_traced_memory()[1] - self._base)
+
+    @contextmanager
+    def stage(self, name: str):
+        if not self.enabled:
+            yield
+            return
+        # Stages nest ("solve" inside "symbolic"); each open stage keeps
+        # [allocated at entry, highest peak seen] so resetting the tracemalloc
+        # peak for an inner stage does not lose the outer one's.
+        current, peak = tracemalloc.get_traced_memory()
+        if self._open:
+            self._open[-1][1] = max(self._open[-1][1], peak)
+        tracemalloc.reset_peak()
+        frame = [current, current]
+        self._open.append(frame)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            current_after, peak_after = tracemalloc.get_traced_memory()
+            self._open.pop()
+            frame[1] = max(frame[1], peak_after)
+            if self._open:
+                self._open[-1][1] = max(self._open[-1][1], frame[1])
+            self.peak_bytes = max(self.peak_bytes, frame[1] - self._base)
+            entry = self.stages.setdefault(name, {"peak_bytes": 0, "retained_bytes": 0, "seconds": 0.0})
+            entry["peak_bytes"] = max(entry["peak_bytes"], frame[1] - frame[0])
+            entry["retained_bytes"] += current_after - frame[0]
+            entry["seconds"] += time.perf_counter() - start
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "tracked": self.enabled,
+            "peak_bytes": self.peak_bytes,
+            "stages": self.stages,
+            # Process-lifetime high-water mark (kilobytes on Linux), tracked or not
+            "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else None,
+        }
+
+
+@contextmanager
+def memory_stage(name: str):
+    """Record a solver stage on the active request's tracker, if any."""
+    tracker = _active_tracker.get()
+    if tracker is None:
+        yield
+        return
+    with tracker.stage(name):
+        yield
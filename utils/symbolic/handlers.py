@@ -12,7 +12,7 @@ Each function returns a dict with at least:
   - error: optional error message when status == "error"
 """
 
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 import sympy as sp
 from sympy import Derivative, Integral
 from sympy.parsing.sympy_parser import (
@@ -20,6 +20,11 @@ from sympy.parsing.sympy_parser import (
     implicit_multiplication_application, convert_xor
 )
 
+from . import backend
+from .cse import should_compress, compressed_derivatives
+from .guards import ExpressionTooLarge, check_size, memory_stage
+from .workspace import NO_WORKSPACE
+
 _transformations = (standard_transformations +
                     (implicit_multiplication_application, convert_xor))
 
@@ -59,23 +64,47 @@ def _to_latex_safe(obj):
             return None
 
 
-def handle_derivative(expr_str: str) -> Dict[str, Any]:
+def _parse_structured(expr_str: str):
+    # Prefer parse_expr for structured input
+    try:
+        return parse_expr(expr_str, transformations=_transformations)
+    except Exception:
+        return sp.sympify(expr_str)
+
+
+def parse_input(expr_str: str, workspace=None):
+    """
+    The expression every handler (derivative, convexity, integral) works on,
+    parsed once per session under a single workspace key, so the artifacts
+    computed from it (diff, gradient_and_hessian, leading_minors, ...) are found
+    by whichever handler asks next.
+    """
+    ws = NO_WORKSPACE if workspace is None else workspace
+    return ws.get("parse", (expr_str,), lambda: _parse_structured(expr_str))
+
+
+def handle_derivative(expr_str: str, compress: Optional[bool] = None, workspace=None) -> Dict[str, Any]:
     """
     Analyze derivative information for an expression.
     Assumes expr_str is already valid SymPy-style (e.g., "diff(x**3, x)" or "x**3").
     Returns a structured dict similar in style to solve_convexity.
+    Derivatives, the Hessian and its minors are computed from the parsed
+    expression, as the convexity handlers do, so either handler reuses the
+    other's; the simplified form is what is reported.
+
+    compress applies to the multi-variable Hessian/minors output (see utils.symbolic.cse):
+    True/False forces it, None switches on above the operation-count threshold.
+    workspace: session Workspace whose artifacts are reused (see utils.symbolic.workspace).
     """
+    ws = NO_WORKSPACE if workspace is None else workspace
     try:
         if not expr_str or not isinstance(expr_str, str):
             return {"status": "error", "error": "Input must be a non-empty SymPy-style string."}
 
-        # Parse expression; prefer parse_expr for structured input
-        try:
-            expr = parse_expr(expr_str, transformations=_transformations)
-        except Exception:
-            expr = sp.sympify(expr_str)
+        expr = parse_input(expr_str, ws)
 
-        expr_simpl = sp.simplify(expr)
+        with memory_stage("simplify"):
+            expr_simpl = ws.get("simplify", (expr,), lambda: check_size(sp.simplify(expr), "simplify"))
         expr_latex = sp.latex(expr_simpl)
         expr_srepr = sp.srepr(expr_simpl)
 
@@ -102,30 +131,35 @@ def handle_derivative(expr_str: str) -> Dict[str, Any]:
             x = free_syms[0]
             try:
                 # If user provided an explicit Derivative/Diff, try to get the underlying function
-                # but we treat expr_simpl as the function f(x)
-                f = expr_simpl
+                # but we treat expr as the function f(x)
+                f = expr
                 # If it's a Derivative node (e.g., parse_expr("diff(f(x), x)")), convert to function where possible
-                if isinstance(f, sp.Derivative):
+                # (simplify evaluates the ones that can be, so check the simplified form)
+                if isinstance(expr_simpl, sp.Derivative):
                     # derivative object; get the expression by calling .doit()? Keep as provided
                     # treat original as derivative; integrate? but primary goal: compute derivatives of function
                     # We'll convert to the expression inside derivative if possible:
                     try:
-                        inner = f.expr
+                        inner = expr_simpl.expr
                         f = inner
                     except Exception:
                         # fallback: keep f as-is
                         pass
 
                 # first and second derivatives
-                f1 = sp.diff(f, x)
-                f2 = sp.diff(f1, x)
-                f1_s = sp.simplify(f1)
-                f2_s = sp.simplify(f2)
+                with memory_stage("differentiate"):
+                    f1 = ws.get("diff", (f, x), lambda: check_size(backend.diff(f, x), "differentiation"))
+                    f2 = ws.get("diff", (f1, x), lambda: check_size(backend.diff(f1, x), "differentiation"))
+                with memory_stage("simplify"):
+                    f1_s = ws.get("simplify", (f1,), lambda: check_size(sp.simplify(f1), "simplify"))
+                    f2_s = ws.get("simplify", (f2,), lambda: check_size(sp.simplify(f2), "simplify"))
 
                 # Critical points: solve f1 == 0
                 critical_points = []
                 try:
-                    sols = sp.solve(sp.Eq(f1_s, 0), x)
+                    with memory_stage("solve"):
+                        sols = ws.get("solve", (sp.Eq(f1_s, 0), x),
+                                      lambda: check_size(sp.solve(sp.Eq(f1_s, 0), x), "solve"))
                     # normalize sols to list
                     if isinstance(sols, dict):
                         sols = list(sols.values())
@@ -138,7 +172,7 @@ def handle_derivative(expr_str: str) -> Dict[str, Any]:
                         # classify using second derivative test where possible
                         classification = "inconclusive"
                         try:
-                            val = f2_s.subs(x, s)
+                            val = backend.subs(f2_s, {x: s})
                             # prefer symbolic flags if available
                             if getattr(val, "is_positive", None) is True or (val.is_real and val > 0):
                                 classification = "local_minimum"
@@ -149,6 +183,8 @@ def handle_derivative(expr_str: str) -> Dict[str, Any]:
                         except Exception:
                             classification = "inconclusive"
                         critical_points.append({"point": s, "classification": classification})
+                except ExpressionTooLarge:
+                    raise
                 except Exception:
                     critical_points = []
 
@@ -157,17 +193,24 @@ def handle_derivative(expr_str: str) -> Dict[str, Any]:
                 try:
                     inc_cond = sp.Ge(f1_s, 0)
                     dec_cond = sp.Le(f1_s, 0)
-                    inc_domain = sp.reduce_inequalities([inc_cond], x)
-                    dec_domain = sp.reduce_inequalities([dec_cond], x)
+                    with memory_stage("reduce_inequalities"):
+                        inc_domain = ws.get("reduce_inequalities", (inc_cond, x),
+                                            lambda: check_size(sp.reduce_inequalities([inc_cond], x), "reduce_inequalities"))
+                        dec_domain = ws.get("reduce_inequalities", (dec_cond, x),
+                                            lambda: check_size(sp.reduce_inequalities([dec_cond], x), "reduce_inequalities"))
                     monotonicity["increasing_intervals"] = inc_domain
                     monotonicity["decreasing_intervals"] = dec_domain
+                except ExpressionTooLarge:
+                    raise
                 except Exception:
                     monotonicity = {"increasing_intervals": None, "decreasing_intervals": None}
 
                 # Inflection points: solve f2 == 0 and attempt sign change test (numerical probe)
                 inflection_points = []
                 try:
-                    inf_sols = sp.solve(sp.Eq(f2_s, 0), x)
+                    with memory_stage("solve"):
+                        inf_sols = ws.get("solve", (sp.Eq(f2_s, 0), x),
+                                          lambda: check_size(sp.solve(sp.Eq(f2_s, 0), x), "solve"))
                     for ip in inf_sols:
                         try:
                             ip_val = float(sp.N(ip))
@@ -181,6 +224,8 @@ def handle_derivative(expr_str: str) -> Dict[str, Any]:
                                 inflection_points.append(ip)
                         except Exception:
                             inflection_points.append(ip)
+                except ExpressionTooLarge:
+                    raise
                 except Exception:
                     inflection_points = []
 
@@ -218,31 +263,76 @@ def handle_derivative(expr_str: str) -> Dict[str, Any]:
                 })
                 return result
 
+            except ExpressionTooLarge as e:
+                return e.as_result()
             except Exception as e:
                 return {"status": "error", "error": f"Single-variable derivative error: {e}"}
 
         # Multi-variable analysis
         try:
             sym_list = free_syms
-            grad = [sp.diff(expr_simpl, v) for v in sym_list]
-            H = sp.Matrix([[sp.diff(g, v) for v in sym_list] for g in grad])
-            H_simpl = sp.simplify(H)
+            with memory_stage("differentiate"):
+                grad, H = ws.get("gradient_and_hessian", (expr, tuple(sym_list)),
+                                 lambda: check_size(backend.gradient_and_hessian(expr, sym_list), "differentiation"))
+            use_cse = should_compress(list(H), compress)
+            # Simplifying every entry of a swollen Hessian is the expensive part; skip it
+            with memory_stage("simplify"):
+                H_simpl = H if use_cse else ws.get("simplify", (sp.ImmutableMatrix(H),),
+                                                   lambda: check_size(sp.simplify(H), "simplify"))
 
             # attempt to solve gradient == 0
             critical_points_mv = []
             try:
-                sol = sp.solve([sp.Eq(g, 0) for g in grad], sym_list, dict=True)
+                with memory_stage("solve"):
+                    sol = ws.get("solve", (tuple(grad), tuple(sym_list)),
+                                 lambda: check_size(sp.solve([sp.Eq(g, 0) for g in grad], sym_list, dict=True), "solve"))
                 for s in sol:
                     pt = tuple(s.get(v, None) for v in sym_list)
                     critical_points_mv.append(pt)
+            except ExpressionTooLarge:
+                raise
             except Exception:
                 critical_points_mv = []
 
+            if use_cse:
+                with memory_stage("minors"):
+                    bundle = ws.get("compressed_derivatives", (expr, tuple(sym_list)),
+                                    lambda: compressed_derivatives(expr, sym_list, grad, H))
+                result.update({
+                    "shared_subexpressions": bundle["subexpressions"],
+                    "gradient_latex": bundle["gradient_latex"],
+                    "hessian_latex": bundle["hessian_latex"],
+                    "principal_minors_latex": bundle["minors_latex"],
+                    "critical_points": [
+                        {"point": [sp.latex(val) for val in pt]} for pt in critical_points_mv
+                    ],
+                    "verdict": "multi_var_undetermined_or_candidate"
+                })
+                result["details"].update({
+                    "compressed": True,
+                    "shared_subexpressions_srepr": [[sp.srepr(sym), sp.srepr(sub)] for sym, sub in bundle["replacements"]],
+                    "gradient_srepr": [sp.srepr(g) for g in bundle["gradient"]],
+                    "hessian_srepr": sp.srepr(bundle["hessian"]),
+                    "principal_minors_srepr": [sp.srepr(m) for m in bundle["minors"]]
+                })
+                return result
+
+            # The same minors analyze_multivariable_convexity computes, simplified
+            try:
+                with memory_stage("minors"):
+                    minors = ws.get("leading_minors", (sp.ImmutableMatrix(H),),
+                                    lambda: check_size(backend.leading_minors(H), "determinant"))
+            except ExpressionTooLarge:
+                raise
+            except Exception:
+                minors = [None] * len(sym_list)
             principal_minors = []
-            for k in range(1, len(sym_list) + 1):
-                M = H_simpl[:k, :k]
+            for m in minors:
                 try:
-                    detk = sp.simplify(M.det())
+                    with memory_stage("simplify"):
+                        detk = None if m is None else ws.get("simplify", (m,), lambda: check_size(sp.simplify(m), "determinant"))
+                except ExpressionTooLarge:
+                    raise
                 except Exception:
                     detk = None
                 principal_minors.append(detk)
@@ -262,26 +352,33 @@ def handle_derivative(expr_str: str) -> Dict[str, Any]:
                 "principal_minors_srepr": [sp.srepr(m) if m is not None else None for m in principal_minors]
             })
             return result
+        except ExpressionTooLarge as e:
+            return e.as_result()
         except Exception as e:
             return {"status": "error", "error": f"Multi-variable derivative error: {e}"}
 
+    except ExpressionTooLarge as e:
+        return e.as_result()
     except Exception as outer_e:
         return {"status": "error", "error": str(outer_e)}
 
 
-def handle_integral(expr_str: str) -> Dict[str, Any]:
+def handle_integral(expr_str: str, workspace=None) -> Dict[str, Any]:
     """
     Compute integral (indefinite or definite if bounds provided).
 
     Returns similar dict shape as handle_derivative.
+    workspace: session Workspace; integrals are keyed by their Integral form, so
+    Integral(f, x) and integrate(f, x) share one result.
     """
+    ws = NO_WORKSPACE if workspace is None else workspace
     try:
-        obj = _safe_parse(expr_str)
+        obj = parse_input(expr_str, ws)
 
         # If it's already an Integral node, evaluate it
         if isinstance(obj, Integral):
             try:
-                res = obj.doit()
+                res = ws.get("integrate", (obj,), obj.doit)
                 method = "Integral.doit"
             except Exception:
                 # maybe definite integral not solvable symbolically
@@ -294,13 +391,13 @@ def handle_integral(expr_str: str) -> Dict[str, Any]:
                 try:
                     parsed = parse_expr(expr_str, local_dict={"Integral": Integral, "integrate": sp.integrate}, transformations=_transformations)
                     if isinstance(parsed, Integral):
-                        res = parsed.doit()
+                        res = ws.get("integrate", (parsed,), parsed.doit)
                         method = "parsed_integral"
                     else:
                         # try to call integrate on parsed expression; pick first free symbol
                         syms = list(parsed.free_symbols)
                         if syms:
-                            res = sp.integrate(parsed, syms[0])
+                            res = ws.get("integrate", (Integral(parsed, syms[0]),), lambda: sp.integrate(parsed, syms[0]))
                             method = f"integrate_wrt_{syms[0]}"
                         else:
                             raise ValueError("No free symbol found to integrate with respect to.")
@@ -308,7 +405,7 @@ def handle_integral(expr_str: str) -> Dict[str, Any]:
                     obj = _safe_parse(expr_str)
                     syms = list(obj.free_symbols)
                     if syms:
-                        res = sp.integrate(obj, syms[0])
+                        res = ws.get("integrate", (Integral(obj, syms[0]),), lambda: sp.integrate(obj, syms[0]))
                         method = f"fallback_integrate_wrt_{syms[0]}"
                     else:
                         raise ValueError("No free symbol found to integrate with respect to.")
@@ -318,9 +415,10 @@ def handle_integral(expr_str: str) -> Dict[str, Any]:
                 if not syms:
                     raise ValueError("No free symbol found to integrate with respect to.")
                 syms_sorted = sorted(syms, key=lambda s: str(s))
-                res = sp.integrate(obj, syms_sorted[0])
+                res = ws.get("integrate", (Integral(obj, syms_sorted[0]),), lambda: sp.integrate(obj, syms_sorted[0]))
                 method = f"integrate_wrt_{syms_sorted[0]}"
 
+        check_size(res, "integration")
         res_s = str(res)
         details = {
             "srepr": sp.srepr(res),
@@ -328,6 +426,8 @@ def handle_integral(expr_str: str) -> Dict[str, Any]:
             "method": method
         }
         return {"status": "ok", "result": res_s, "details": details}
+    except ExpressionTooLarge as e:
+        return e.as_result()
     except Exception as e:
         return {"status": "error", "error": str(e)}
 
@@ -0,0 +1,402 @@
+"""
+Nearest-neighbour classification index over previously labelled expressions.
+
+Sits between deterministic_classify and the transformer in ml_classifier.classify:
+most production inputs are structurally near-identical to ones already labelled,
+so a vote among their nearest neighbours answers without a model forward pass.
+
+Features (expression_features) come from the sympified tree: operator/function
+histogram, depth, number of variables, polynomial degree pattern and flags for
+Derivative / Integral / Relational / systems. They are feature-hashed into a
+fixed-size, L2-normalised float32 vector.
+
+Lookup:
+  1. exact signature (quantised vector) -> label counts, O(1)
+  2. otherwise brute-force cosine similarity over all vectors, top-k vote
+An answer is only returned when the neighbours agree (min_agreement), are
+close enough (min_similarity) and at least min_support entries back it, so a
+single (possibly wrong) label never answers for a whole structure; otherwise
+the caller falls back to the model.
+
+The index is append-only and incrementally updatable (add / add_vectors), and
+persists to a single .npz file (save / load). append_to merges the entries
+added since load into the file instead, so several processes sharing one file
+(pre-fork workers) each keep what they learned.
+
+Seeding from labelled data (build_from / extend take (expression, label) pairs):
+
+    python -m utils.symbolic.knn_index knn.npz --labelled labels.jsonl --traffic traffic.jsonl
+
+--labelled reads JSON lines {"expression": ..., "label": ...} with ml_classifier
+labels; --traffic reads a TRAFFIC_CAPTURE_PATH log and labels each error-free
+request from its LLM category. Entries are merged into the index file.
+"""
+
+import argparse
+import json
+import math
+import os
+import re
+import tempfile
+import threading
+import zlib
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import sympy as sp
+from sympy.core.relational import Relational
+
+from .guards import check_expression
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+DIM = 32
+
+
+def _bucket(name: str, dim: int) -> Tuple[int, float]:
+    h = zlib.crc32(name.encode())
+    return h % dim, (1.0 if (h >> 31) & 1 else -1.0)
+
+
+def expression_features(obj) -> Counter:
+    """Structural feature counts of a SymPy object (or tuple of them, for systems)."""
+    feats: Counter = Counter()
+    items = list(obj) if isinstance(obj, (list, tuple, sp.Tuple)) else [obj]
+    if len(items) > 1:
+        feats["system"] += 1
+        feats[f"system_len:{min(len(items), 6)}"] += 1
+
+    for item in items:
+        item = sp.sympify(item)
+        depth = 0
+        stack = [(item, 1)]
+        while stack:
+            node, d = stack.pop()
+            depth = max(depth, d)
+            if node.is_Atom:
+                if node.is_Symbol:
+                    feats["atom:symbol"] += 1
+                elif node.is_Number:
+                    feats["atom:int" if node.is_Integer else "atom:number"] += 1
+                continue
+            feats[f"op:{type(node).__name__}"] += 1
+            stack.extend((arg, d + 1) for arg in node.args)
+        feats[f"depth:{min(depth, 12)}"] += 1
+
+        syms = item.free_symbols
+        feats[f"nvars:{min(len(syms), 6)}"] += 1
+        for flag, cls in (("derivative", sp.Derivative), ("integral", sp.Integral), ("relational", Relational)):
+            if item.has(cls):
+                feats[f"has:{flag}"] += 1
+
+        body = item.lhs - item.rhs if isinstance(item, Relational) else item
+        try:
+            if syms and body.is_polynomial(*syms):
+                degrees = sorted((sp.degree(body, s) for s in syms), reverse=True)
+                feats["poly"] += 1
+                feats[f"deg_pattern:{','.join(str(min(int(d), 6)) for d in degrees[:3])}"] += 1
+            else:
+                feats["nonpoly"] += 1
+        except Exception:
+            feats["nonpoly"] += 1
+    return feats
+
+
+_EQUALS = re.compile(r"(?<![<>!=])=(?!=)")
+
+
+def _split_top_level(expr_str: str) -> List[str]:
+    # Commas inside calls and brackets (Eq(x, 1), diff(f, x), (x, 0, 1)) do not separate parts
+    parts, depth, start = [], 0, 0
+    for i, ch in enumerate(expr_str):
+        if ch in "([{":
+            depth += 1
+        elif ch in ")]}":
+            depth -= 1
+        elif ch == "," and depth == 0:
+            parts.append(expr_str[start:i])
+            start = i + 1
+    parts.append(expr_str[start:])
+    return [p for p in parts if p.strip()]
+
+
+def featurize(expr_str: str, dim: int = DIM) -> np.ndarray:
+    """
+    Hashed, L2-normalised feature vector for an expression string: one expression,
+    "lhs = rhs", or several of either separated by top-level commas (a system).
+    Raises guards.UnsafeExpression for text check_expression rejects.
+    """
+    objs = []
+    for part in _split_top_level(check_expression(expr_str)):
+        sides = _EQUALS.split(part)
+        if len(sides) == 2:
+            objs.append(sp.Eq(sp.sympify(sides[0]), sp.sympify(sides[1])))
+        else:
+            objs.append(sp.sympify(part))
+    feats = expression_features(objs if len(objs) > 1 else objs[0])
+    vec = np.zeros(dim, dtype=np.float32)
+    for name, count in feats.items():
+        i, sign = _bucket(name, dim)
+        vec[i] += sign * math.log1p(count)
+    norm = float(np.linalg.norm(vec))
+    return vec / norm if norm else vec
+
+
+def _signatures(vectors: np.ndarray) -> np.ndarray:
+    q = np.round(vectors * 127).astype(np.int8)
+    return np.ascontiguousarray(q).view(np.dtype((np.void, q.shape[1]))).ravel()
+
+
+class KNNIndex:
+    """
+    Args:
+        dim: feature vector size
+        k: neighbours consulted in the brute-force tier
+        min_agreement: fraction of neighbour votes the winning label needs
+        min_similarity: cosine similarity every voting neighbour must reach
+        min_support: entries that must carry the winning label before either tier answers
+    """
+
+    def __init__(self, dim: int = DIM, k: int = 5, min_agreement: float = 0.8, min_similarity: float = 0.97,
+                 min_support: int = 3):
+        self.dim = dim
+        self.k = k
+        self.min_agreement = min_agreement
+        self.min_similarity = min_similarity
+        self.min_support = min_support
+        self.labels: List[str] = []
+        self._label_ids: Dict[str, int] = {}
+        self._vectors = np.zeros((1024, dim), dtype=np.float32)
+        self._ys = np.zeros(1024, dtype=np.int32)
+        self._n = 0
+        self._exact: Dict[bytes, Counter] = {}
+        self._persisted = 0  # entries [0, _persisted) are already in the file (see append_to)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._n
+
+    def _label_id(self, label: str) -> int:
+        if label not in self._label_ids:
+            self._label_ids[label] = len(self.labels)
+            self.labels.append(label)
+        return self._label_ids[label]
+
+    def _reserve(self, extra: int) -> None:
+        need = self._n + extra
+        if need <= len(self._vectors):
+            return
+        cap = max(need, 2 * len(self._vectors))
+        vectors = np.zeros((cap, self.dim), dtype=np.float32)
+        ys = np.zeros(cap, dtype=np.int32)
+        vectors[:self._n] = self._vectors[:self._n]
+        ys[:self._n] = self._ys[:self._n]
+        self._vectors, self._ys = vectors, ys
+
+    def add(self, expr_str: str, label: str) -> None:
+        self.add_vectors(featurize(expr_str, self.dim)[None, :], [label])
+
+    def extend(self, records: Iterable[Tuple[str, str]]) -> int:
+        """
+        Add (expression, label) pairs in bulk. Expressions that cannot be
+        featurized are skipped; returns the number added.
+        """
+        vectors, labels = [], []
+        for expr_str, label in records:
+            try:
+                vectors.append(featurize(expr_str, self.dim))
+            except Exception:
+                continue
+            labels.append(label)
+        if vectors:
+            self.add_vectors(np.stack(vectors), labels)
+        return len(labels)
+
+    @classmethod
+    def build_from(cls, records: Iterable[Tuple[str, str]], **kwargs) -> "KNNIndex":
+        """New index (constructor arguments in kwargs) holding labelled (expression, label) pairs."""
+        index = cls(**kwargs)
+        index.extend(records)
+        return index
+
+    def add_vectors(self, vectors: np.ndarray, labels: Iterable[str]) -> None:
+        """Bulk append of precomputed feature vectors."""
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        with self._lock:
+            ys = np.array([self._label_id(label) for label in labels], dtype=np.int32)
+            self._reserve(len(vectors))
+            self._vectors[self._n:self._n + len(vectors)] = vectors
+            self._ys[self._n:self._n + len(vectors)] = ys
+            self._n += len(vectors)
+            self._index_signatures(vectors, ys)
+
+    def _index_signatures(self, vectors: np.ndarray, ys: np.ndarray) -> None:
+        sigs = _signatures(vectors)
+        uniq, inverse = np.unique(sigs, return_inverse=True)
+        pairs, counts = np.unique(np.stack([inverse, ys], axis=1), axis=0, return_counts=True)
+        for (sig_idx, label_id), count in zip(pairs, counts):
+            self._exact.setdefault(uniq[sig_idx].tobytes(), Counter())[int(label_id)] += int(count)
+
+    def query(self, expr_str: str) -> Tuple[Optional[str], float, str]:
+        """
+        Returns (label, confidence, tier) with tier "exact" or "knn", or
+        (None, confidence, "miss") when the neighbours do not agree.
+        """
+        return self.query_vector(featurize(expr_str, self.dim))
+
+    def query_vector(self, vec: np.ndarray) -> Tuple[Optional[str], float, str]:
+        if self._n == 0:
+            return None, 0.0, "miss"
+        counts = self._exact.get(_signatures(vec[None, :])[0].tobytes())
+        if counts:
+            label_id, votes = counts.most_common(1)[0]
+            agreement = votes / sum(counts.values())
+            if agreement >= self.min_agreement and votes >= self.min_support:
+                return self.labels[label_id], agreement, "exact"
+
+        n = self._n
+        sims = self._vectors[:n] @ vec
+        k = min(self.k, n)
+        top = np.argpartition(-sims, k - 1)[:k]
+        top = top[sims[top] >= self.min_similarity]
+        if len(top) == 0:
+            return None, 0.0, "miss"
+        votes = Counter(self._ys[top].tolist())
+        label_id, count = votes.most_common(1)[0]
+        agreement = count / k
+        if agreement < self.min_agreement or count < self.min_support:
+            return None, agreement, "miss"
+        return self.labels[label_id], agreement, "knn"
+
+    def save(self, path: str) -> None:
+        """Write the whole index to `path` (exactly that name; replaced atomically)."""
+        with self._lock:
+            arrays = dict(vectors=self._vectors[:self._n].copy(), ys=self._ys[:self._n].copy(),
+                          labels=np.array(self.labels, dtype=str),
+                          params=np.array([self.k, self.min_agreement, self.min_similarity, self.min_support]))
+            n = self._n
+        # np.savez appends ".npz" to file names, but not to open files
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as fh:
+            np.savez(fh, **arrays)
+        os.replace(tmp, path)
+        with self._lock:
+            self._persisted = max(self._persisted, n)
+
+    def append_to(self, path: str) -> None:
+        """
+        Merge the entries added since load (or creation) into the index file at
+        `path`, keeping whatever other processes have appended to it meanwhile.
+        """
+        with self._lock:
+            start, end = self._persisted, self._n
+            vectors = self._vectors[start:end].copy()
+            labels = [self.labels[y] for y in self._ys[start:end]]
+        if not labels:
+            return
+        with _file_lock(path + ".lock"):
+            merged = KNNIndex.load(path) if os.path.exists(path) else \
+                KNNIndex(self.dim, self.k, self.min_agreement, self.min_similarity, self.min_support)
+            merged.add_vectors(vectors, labels)
+            merged.save(path)
+        with self._lock:
+            self._persisted = max(self._persisted, end)
+
+    @classmethod
+    def load(cls, path: str) -> "KNNIndex":
+        with np.load(path) as data:
+            params, vectors, ys = data["params"], data["vectors"], data["ys"]
+            labels = [str(label) for label in data["labels"]]
+        k, min_agreement, min_similarity = params[:3]
+        index = cls(dim=vectors.shape[1], k=int(k), min_agreement=float(min_agreement),
+                    min_similarity=float(min_similarity))
+        if len(params) > 3:
+            index.min_support = int(params[3])
+        index.add_vectors(vectors, [labels[y] for y in ys])
+        index._persisted = len(index)
+        return index
+
+
+@contextmanager
+def _file_lock(path: str):
+    # Serialises append_to across processes; without fcntl (Windows) it is a no-op
+    if fcntl is None:
+        yield
+        return
+    with open(path, "a") as fh:
+        fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+# -------------------------
+# Seeding from labelled data
+# -------------------------
+def labelled_records(path: str) -> Iterable[Tuple[str, str]]:
+    """(expression, label) pairs from JSON lines {"expression": ..., "label": ...}."""
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue
+            if rec.get("expression") and rec.get("label"):
+                yield rec["expression"], rec["label"]
+
+
+def traffic_records(path: str) -> Iterable[Tuple[str, str]]:
+    """
+    (expression, label) pairs from a traffic capture log: the LLM category of each
+    request that was solved without error, refined to the classifier's labels
+    with the linearity tests route_query uses.
+    """
+    from utils.router import is_nonlinear_equation, is_nonlinear_system
+    from utils.traffic import load_traffic
+
+    for rec in load_traffic(path):
+        expr_str, category = rec.get("expression"), rec.get("category")
+        if not expr_str or rec.get("error"):
+            continue
+        # The linearity tests parse Eq(lhs, rhs) and "lhs - (rhs)" forms, not "lhs = rhs"
+        sides = [_EQUALS.split(part) for part in _split_top_level(expr_str)]
+        if category == "equation":
+            equation = f"Eq({sides[0][0]}, {sides[0][1]})" if len(sides[0]) == 2 else expr_str
+            label = "equation_nonlinear" if is_nonlinear_equation(equation) else "equation_linear"
+        elif category == "system":
+            system = ", ".join(f"{s[0]} - ({s[1]})" if len(s) == 2 else s[0] for s in sides)
+            label = "system_nonlinear" if is_nonlinear_system(system) else "system_linear"
+        elif category == "convexity":
+            label = "convexity_problem"
+        elif category in ("derivative", "integral"):
+            label = category
+        else:
+            continue
+        yield expr_str, label
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Merge labelled expressions into a k-NN index file.")
+    parser.add_argument("index", help="index .npz file (created if missing)")
+    parser.add_argument("--labelled", action="append", default=[], help="JSON lines with expression and label")
+    parser.add_argument("--traffic", action="append", default=[], help="TRAFFIC_CAPTURE_PATH log")
+    args = parser.parse_args(argv)
+
+    index = KNNIndex()
+    for path in args.labelled:
+        print(f"{path}: {index.extend(labelled_records(path))} entries")
+    for path in args.traffic:
+        print(f"{path}: {index.extend(traffic_records(path))} entries")
+    index.append_to(args.index)
+    print(f"{args.index}: {len(KNNIndex.load(args.index)) if os.path.exists(args.index) else 0} entries in total")
+
+
+if __name__ == "__main__":
+    main()
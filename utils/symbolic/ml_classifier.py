@@ -1,8 +1,13 @@
+import atexit
+import os
+
 import torch
 import sympy as sp
 from sympy import Derivative, Integral, Eq
 from transformers import AutoTokenizer, AutoModelForSequenceClassification
 
+from utils.symbolic.knn_index import KNNIndex, featurize
+
 
 MODEL_DIR = "shamEiNew/symbolic-math-classifier"
 tokenizer = AutoTokenizer.from_pretrained(MODEL_DIR)
@@ -11,6 +16,21 @@ model.eval()
 
 id2label = model.config.id2label
 
+# Nearest-neighbour tier, learned from confident model answers. When
+# KNN_INDEX_PATH is set, what this process learned is merged into that file on
+# exit (every pre-fork worker runs this hook, so it must not overwrite).
+KNN_INDEX_PATH = os.getenv("KNN_INDEX_PATH")
+knn_index = KNNIndex.load(KNN_INDEX_PATH) if KNN_INDEX_PATH and os.path.exists(KNN_INDEX_PATH) else KNNIndex()
+
+
+def save_knn_index(path=None):
+    path = path or KNN_INDEX_PATH
+    if path:
+        knn_index.append_to(path)
+
+
+atexit.register(save_knn_index)
+
 
 # -------------------------
 # Deterministic classifier
@@ -109,18 +129,31 @@ def ml_classify(expr_str, threshold=0.70):
 def classify(expr_str):
     """
     1. Try deterministic rules → most accurate
-    2. Try ML model → robust
-    3. Fallback → unknown
+    2. Try nearest neighbours among labelled expressions → cheap
+    3. Try ML model → robust
+    4. Fallback → unknown
     """
     # Step 1 — Deterministic
     d_label, d_conf = deterministic_classify(expr_str)
     if d_label:
         return d_label, d_conf, "deterministic"
 
-    # Step 2 — ML model
+    # Step 2 — k-NN vote over structural features
+    try:
+        vec = featurize(expr_str, knn_index.dim)
+    except Exception:
+        vec = None
+    if vec is not None:
+        k_label, k_conf, _ = knn_index.query_vector(vec)
+        if k_label:
+            return k_label, k_conf, "knn"
+
+    # Step 3 — ML model
     m_label, m_conf = ml_classify(expr_str)
     if m_label:
+        if vec is not None:
+            knn_index.add_vectors(vec[None, :], [m_label])
         return m_label, m_conf, "ml"
 
-    # Step 3 — Final fallback
+    # Step 4 — Final fallback
     return "unknown", 0.0, "fallback"
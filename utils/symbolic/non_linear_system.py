@@ -1,5 +1,6 @@
 import sympy as sp
 from sympy.parsing.sympy_parser import parse_expr
+from .guards import ExpressionTooLarge, check_size, memory_stage
 
 def solve_nonlinear_system(equation_strs):
     try:
@@ -11,12 +12,15 @@ def solve_nonlinear_system(equation_strs):
         symbols = sorted({sym for eq in equations for sym in eq.free_symbols}, key=lambda s: s.name)
 
         # Solve the system
-        solutions = sp.nonlinsolve(equations, symbols)
+        with memory_stage("nonlinsolve"):
+            solutions = check_size(sp.nonlinsolve(equations, symbols), "nonlinsolve")
 
         return {
             "equations": [sp.latex(eq) for eq in equations],
             "variables": [sp.latex(s) for s in symbols],
             "solution": [sp.latex(sol) for sol in solutions]
         }
+    except ExpressionTooLarge as e:
+        return e.as_result()
     except Exception as e:
         return {"error": str(e)}
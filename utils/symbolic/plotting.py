@@ -0,0 +1,284 @@
+"""
+Plot data for single-variable results (solve_convexity, handle_derivative).
+
+f, f' and f'' are lambdified once to NumPy and evaluated on whole arrays, so no
+SymPy call is made per point:
+
+  1. evaluate on a uniform grid
+  2. refine adaptively: bisect intervals where the chord misses the curve
+     (curvature), where f' or f'' changes sign (critical / inflection points) or
+     where f becomes undefined (domain edges, singularities)
+  3. break lines at poles (NaN separators) instead of drawing vertical jumps
+  4. downsample each series to the pixel budget with LTTB
+
+Convex/concave intervals, critical and inflection points are read off the
+refined samples. Output is columnar (lists) or a compact binary encoding
+(encode_binary) of little-endian float32 arrays.
+"""
+
+import json
+import math
+import os
+import struct
+import time
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import sympy as sp
+from sympy.parsing.sympy_parser import parse_expr, standard_transformations, implicit_multiplication_application, convert_xor
+
+from . import backend
+from .guards import ExpressionTooLarge, UnsafeExpression, check_expression, check_size, memory_stage
+
+_transformations = (standard_transformations + (implicit_multiplication_application, convert_xor))
+
+MAX_PLOT_POINTS = int(os.getenv("MAX_PLOT_POINTS", "1000000"))
+MAX_MARKERS = 200
+SERIES = ("f", "first_derivative", "second_derivative")
+
+
+def _compile(expr_str: str):
+    expr = parse_expr(check_expression(expr_str), transformations=_transformations)
+    syms = sorted(expr.free_symbols, key=lambda s: s.name)
+    if len(syms) > 1:
+        raise ValueError("Plotting needs a single-variable expression, got " + ", ".join(map(str, syms)))
+    x = syms[0] if syms else sp.Symbol("x")
+    with memory_stage("differentiate"):
+        f1 = check_size(backend.diff(expr, x), "differentiation")
+        f2 = check_size(backend.diff(f1, x), "differentiation")
+    # One function for all three with shared subexpressions; polynomials in
+    # Horner form so NumPy does multiply-adds instead of pow
+    exprs = [sp.horner(e) if e.is_polynomial(x) and e.free_symbols else e for e in (expr, f1, f2)]
+    return expr, x, sp.lambdify(x, exprs, modules="numpy", cse=True)
+
+
+def _evaluate(func, xs: np.ndarray) -> np.ndarray:
+    """(3, n) array of f, f', f''; complex, infinite or failed values become NaN."""
+    out = np.empty((len(SERIES), len(xs)))
+    with np.errstate(all="ignore"):
+        for i, y in enumerate(func(xs)):
+            y = np.asarray(y)
+            if np.iscomplexobj(y):
+                y = np.where(np.abs(y.imag) <= 1e-12 * (1 + np.abs(y.real)), y.real, np.nan)
+            out[i] = np.broadcast_to(y.astype(float, copy=False), xs.shape)
+    out[~np.isfinite(out)] = np.nan
+    return out
+
+
+def _y_range(y: np.ndarray) -> List[float]:
+    """1st-99th percentile of the finite values (on a strided subsample for large arrays)."""
+    finite = y[::max(1, len(y) // 65536)]
+    finite = finite[np.isfinite(finite)]
+    return np.percentile(finite, [1, 99]).tolist() if finite.size else [0.0, 0.0]
+
+
+def _y_scale(y: np.ndarray) -> float:
+    lo, hi = _y_range(y)
+    return float(hi - lo) or max(1.0, float(abs(hi)))
+
+
+def _sign_change(y: np.ndarray) -> np.ndarray:
+    s = np.sign(y)
+    # A sample exactly at the root is counted once, on the interval ending there
+    return (s[:-1] * s[1:] < 0) | ((s[1:] == 0) & (s[:-1] != 0))
+
+
+def _refine(func, xs, ys, max_points, rounds, tol):
+    """Bisect flagged intervals until nothing is flagged or the budget is spent."""
+    min_width = (xs[-1] - xs[0]) * 1e-12
+    done = 0
+    while done < rounds and len(xs) < max_points:
+        mids = 0.5 * (xs[:-1] + xs[1:])
+        ym = _evaluate(func, mids)
+        f = ys[0]
+        with np.errstate(invalid="ignore"):
+            curved = np.abs(ym[0] - 0.5 * (f[:-1] + f[1:])) > tol * _y_scale(f)
+        flag = curved | _sign_change(ys[1]) | _sign_change(ys[2]) | (np.isnan(f[:-1]) != np.isnan(f[1:]))
+        flag &= np.diff(xs) > min_width
+        if not flag.any():
+            break
+        idx = np.flatnonzero(flag)[:max_points - len(xs)]
+        xs = np.insert(xs, idx + 1, mids[idx])
+        ys = np.insert(ys, idx + 1, ym[:, idx], axis=1)
+        done += 1
+    return xs, ys, done
+
+
+def _pole_breaks(xs, y, scale):
+    """Intervals where a series jumps across a pole: sign flip between two huge values."""
+    with np.errstate(invalid="ignore"):
+        big = np.minimum(np.abs(y[:-1]), np.abs(y[1:])) > 10 * scale
+    return np.flatnonzero(_sign_change(y) & big)
+
+
+def _crossings(xs, y, breaks) -> List[Tuple[int, float]]:
+    """(interval index, interpolated x) of sign changes that are not pole breaks."""
+    idx = np.setdiff1d(np.flatnonzero(_sign_change(y) & np.isfinite(y[:-1]) & np.isfinite(y[1:])), breaks)
+    y0, y1 = y[idx], y[idx + 1]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        t = np.where(y1 != y0, y0 / (y0 - y1), 0.0)
+    return list(zip(idx.tolist(), (xs[idx] + t * (xs[idx + 1] - xs[idx])).tolist()))
+
+
+def _intervals(xs, mask) -> List[List[float]]:
+    """Runs of True in mask as [start, end] x-ranges."""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1) - 1
+    return [[float(xs[a]), float(xs[b])] for a, b in zip(starts, ends) if b > a]
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Indices chosen by Largest-Triangle-Three-Buckets for a finite series."""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    chosen = np.empty(n_out, dtype=np.int64)
+    chosen[0], chosen[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nlo, nhi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        cx, cy = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        bx, by = x[lo:hi], y[lo:hi]
+        area = np.abs((x[a] - cx) * (by - y[a]) - (x[a] - bx) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        chosen[i + 1] = a
+    return chosen
+
+
+def downsample(x: np.ndarray, y: np.ndarray, n_out: int) -> Tuple[np.ndarray, np.ndarray]:
+    """LTTB per finite segment (budget split by length), keeping NaN gaps as separators."""
+    finite = np.isfinite(y)
+    edges = np.diff(np.concatenate(([0], finite.astype(np.int8), [0])))
+    segments = list(zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)))
+    total = int(finite.sum())
+    xs_out, ys_out = [], []
+    for k, (a, b) in enumerate(segments):
+        if k:
+            xs_out.append([0.5 * (x[a - 1] + x[a])])
+            ys_out.append([np.nan])
+        keep = a + lttb(x[a:b], y[a:b], max(3, n_out * (b - a) // max(total, 1)))
+        xs_out.append(x[keep])
+        ys_out.append(y[keep])
+    if not xs_out:
+        return np.empty(0), np.empty(0)
+    return np.concatenate(xs_out), np.concatenate(ys_out)
+
+
+def plot_data(expr_str: str, x_min: float = -10.0, x_max: float = 10.0, width: int = 800,
+              samples: int = None, max_points: int = None, rounds: int = 16, tol: float = 1e-3) -> Dict[str, Any]:
+    """
+    Args:
+        expr_str: single-variable SymPy-style expression
+        x_min, x_max: plotted range
+        width: pixel budget; each series is downsampled to about this many points
+        samples: initial uniform grid size (default 4 * width)
+        max_points: cap on evaluated points after refinement (default MAX_PLOT_POINTS)
+        rounds: maximum bisection rounds
+        tol: chord error, relative to the y-range, that triggers refinement
+    """
+    try:
+        if not math.isfinite(x_max - x_min):
+            return {"status": "error", "error": "x_min, x_max and their difference must be finite"}
+        if not x_max > x_min:
+            return {"status": "error", "error": "x_max must be greater than x_min"}
+        max_points = min(max_points or MAX_PLOT_POINTS, MAX_PLOT_POINTS)
+        samples = min(samples or 4 * width, max_points)
+        expr, x, func = _compile(expr_str)
+
+        t0 = time.perf_counter()
+        xs = np.linspace(x_min, x_max, samples)
+        ys = _evaluate(func, xs)
+        xs, ys, done = _refine(func, xs, ys, max_points, rounds, tol)
+        evaluated = len(xs)
+
+        scales = [_y_scale(y) for y in ys]
+        breaks = [_pole_breaks(xs, y, s) for y, s in zip(ys, scales)]
+
+        critical = []
+        for i, cx in _crossings(xs, ys[1], breaks[0]):
+            f2 = ys[2][i] if abs(cx - xs[i]) < abs(cx - xs[i + 1]) else ys[2][i + 1]
+            kind = "local_minimum" if f2 > 0 else "local_maximum" if f2 < 0 else "inconclusive"
+            critical.append({"x": cx, "y": float(np.interp(cx, xs[i:i + 2], ys[0][i:i + 2])), "classification": kind})
+        inflection = [{"x": cx, "y": float(np.interp(cx, xs[i:i + 2], ys[0][i:i + 2]))}
+                      for i, cx in _crossings(xs, ys[2], np.union1d(breaks[0], breaks[2]))]
+
+        with np.errstate(invalid="ignore"):
+            convex = _intervals(xs, ys[2] >= 0)
+            concave = _intervals(xs, ys[2] <= 0)
+
+        series = {}
+        for name, y, brk in zip(SERIES, ys, breaks):
+            y = y.copy()
+            # NaN at the larger side of each pole so the line is not drawn across it
+            side = brk + (np.abs(y[brk + 1]) > np.abs(y[brk]))
+            y[side] = np.nan
+            sx, sy = downsample(xs, y, width)
+            series[name] = {"x": sx, "y": sy}
+
+        return {
+            "status": "ok",
+            "expression": sp.latex(expr),
+            "variable": str(x),
+            "x_range": [x_min, x_max],
+            "y_range": _y_range(ys[0]),
+            "series": series,
+            "convex_intervals": convex[:MAX_MARKERS],
+            "concave_intervals": concave[:MAX_MARKERS],
+            "critical_points": critical[:MAX_MARKERS],
+            "inflection_points": inflection[:MAX_MARKERS],
+            "truncated": max(len(convex), len(concave), len(critical), len(inflection)) > MAX_MARKERS,
+            "stats": {
+                "evaluated_points": evaluated,
+                "refinement_rounds": done,
+                "output_points": int(sum(len(s["x"]) for s in series.values())),
+                "elapsed_ms": round((time.perf_counter() - t0) * 1e3, 2),
+            },
+        }
+    except (ExpressionTooLarge, UnsafeExpression) as e:
+        return e.as_result()
+    except Exception as e:
+        return {"status": "error", "error": f"Plot error: {e}"}
+
+
+def _json_safe(value):
+    # NaN / Infinity are not JSON; non-finite numbers become null
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {k: _json_safe(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_json_safe(v) for v in value]
+    return value
+
+
+def to_columnar(data: Dict[str, Any]) -> Dict[str, Any]:
+    """JSON-safe copy: arrays become lists, non-finite values (NaN gaps included) become null."""
+    out = _json_safe({k: v for k, v in data.items() if k != "series"})
+    out["series"] = {
+        name: {k: [round(v, 9) if math.isfinite(v) else None for v in arr.tolist()] for k, arr in s.items()}
+        for name, s in data.get("series", {}).items()
+    }
+    return out
+
+
+def encode_binary(data: Dict[str, Any]) -> bytes:
+    """
+    b"PLT1" | uint32 header length | JSON header | float32 arrays (little-endian).
+
+    The header is the plot data without the arrays; header["arrays"] maps
+    "<series>.x" / "<series>.y" to [byte offset, length] within the array block.
+    """
+    header = _json_safe({k: v for k, v in data.items() if k != "series"})
+    header["arrays"] = {}
+    chunks, offset = [], 0
+    for name, s in data.get("series", {}).items():
+        for key in ("x", "y"):
+            arr = np.asarray(s[key], dtype="<f4")
+            header["arrays"][f"{name}.{key}"] = [offset, len(arr)]
+            chunks.append(arr.tobytes())
+            offset += arr.nbytes
+    head = json.dumps(header, separators=(",", ":")).encode()
+    head += b" " * (-len(head) % 4)
+    return b"PLT1" + struct.pack("<I", len(head)) + head + b"".join(chunks)
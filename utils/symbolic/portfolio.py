@@ -0,0 +1,415 @@
+"""
+Portfolio solving: race alternative SymPy strategies and keep the first answer.
+
+portfolio_solve(query_type, expr_str) runs several strategies for the same
+`equation`, `system` or `integral` query in separate processes, returns the first
+complete answer and terminates the rest. Numeric strategies (nsolve) only win
+once every exact strategy has failed or `numeric_grace` seconds have passed.
+
+Wins are counted per expression shape (see expression_shape) in PortfolioStats;
+strategies with more wins for a shape are launched first, and the top
+`max_parallel` (default: CPU count, at least 2) start at once. The next-ranked
+strategy starts whenever one finishes without winning, or after `time_slice`
+seconds without a finish, so a stuck strategy cannot hold the others back for
+the whole timeout. Stats persist to PORTFOLIO_STATS_PATH when the variable is
+set; each win is merged into the file under a lock, so processes sharing it
+(pre-fork workers) keep each other's counts.
+
+Every strategy formats its answer like the solver route_query would pick for
+the input (e.g. solve_nonlinear_system for a nonlinear system), so the result
+has the same shape whichever strategy wins, plus a "strategy" key naming it.
+
+Strategies run in processes forked from a fork server (a single-threaded
+process with this module preloaded), never from the calling process: servers
+call this from worker threads, and forking a multi-threaded process can
+deadlock the child.
+"""
+
+import json
+import multiprocessing as mp
+import os
+import queue
+import tempfile
+import threading
+import time
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional
+
+import sympy as sp
+from sympy import Eq, I, latex
+from sympy.parsing.sympy_parser import parse_expr
+
+from .handlers import _safe_parse, handle_integral
+from .knn_index import _file_lock
+from .non_linear_system import solve_nonlinear_system
+from .solve_equation import solve_equation, solve_nonlinear_equation
+from .solve_linear_system import solve_system_of_equations
+
+
+# -------------------------
+# Strategies
+# -------------------------
+def _parse_equation(expr_str):
+    if '=' not in expr_str:
+        raise ValueError("Not an equation")
+    lhs_str, rhs_str = expr_str.split('=')
+    return Eq(parse_expr(lhs_str.strip()), parse_expr(rhs_str.strip()))
+
+
+def _equation_result(equation, solution, nonlinear):
+    # Same keys as solve_nonlinear_equation / solve_equation
+    result = {
+        "number_of_solution": len(solution),
+        "equation": latex(equation),
+        "solution": [latex(sol) for sol in solution],
+    }
+    if not nonlinear:
+        result["all_roots_real"] = all(not sol.has(I) for sol in solution)
+        result["all_roots_complex"] = all(sol.has(I) for sol in solution)
+    return result
+
+
+def _equation_solve(expr_str, nonlinear):
+    return (solve_nonlinear_equation if nonlinear else solve_equation)(expr_str)
+
+
+def _equation_solveset(expr_str, nonlinear):
+    equation = _parse_equation(expr_str)
+    syms = sorted(equation.free_symbols, key=lambda s: s.name)
+    if len(syms) != 1:
+        raise ValueError("solveset strategy needs exactly one variable")
+    sol_set = sp.solveset(equation, syms[0], domain=sp.S.Complexes)
+    if not isinstance(sol_set, sp.FiniteSet):
+        raise ValueError(f"solveset returned a non-finite set: {sol_set}")
+    return _equation_result(equation, list(sol_set), nonlinear)
+
+
+def _equation_roots(expr_str, nonlinear):
+    equation = _parse_equation(expr_str)
+    f = equation.lhs - equation.rhs
+    syms = list(f.free_symbols)
+    # Without an explicit symbol Poly would take e.g. exp(x) as the generator
+    if len(syms) != 1 or not f.is_polynomial(syms[0]):
+        raise ValueError("roots strategy needs a univariate polynomial")
+    poly = sp.Poly(f, syms[0])
+    found = sp.roots(poly)
+    if sum(found.values()) != poly.degree():
+        raise ValueError("roots could not find every root in radicals")
+    return _equation_result(equation, list(found), nonlinear)
+
+
+def _equation_nsolve(expr_str, nonlinear, seeds=21, span=10.0):
+    equation = _parse_equation(expr_str)
+    f = equation.lhs - equation.rhs
+    syms = list(f.free_symbols)
+    if len(syms) != 1:
+        raise ValueError("nsolve strategy needs exactly one variable")
+    found: List[sp.Float] = []
+    for k in range(seeds):
+        x0 = -span + 2 * span * k / (seeds - 1)
+        try:
+            root = sp.nsolve(f, syms[0], x0)
+        except Exception:
+            continue
+        if root.is_real and all(abs(root - r) > 1e-8 for r in found):
+            found.append(root)
+    if not found:
+        raise ValueError("nsolve found no real roots")
+    result = _equation_result(equation, sorted(found), nonlinear)
+    result["note"] = "Numerical real roots from nsolve; may be incomplete."
+    return result
+
+
+def _parse_system(expr_str):
+    eqs = [parse_expr(eq_str) for eq_str in expr_str.split(',')]
+    return eqs, sorted({s for e in eqs for s in e.free_symbols}, key=lambda s: s.name)
+
+
+def _system_result(eqs, syms, solutions, nonlinear):
+    """Solution tuples (ordered like syms) in the shape of solve_nonlinear_system / solve_system_of_equations."""
+    if nonlinear:
+        return {
+            "equations": [latex(e) for e in eqs],
+            "variables": [latex(s) for s in syms],
+            "solution": [latex(sp.Tuple(*sol)) for sol in solutions],
+        }
+    return {
+        "equations": [latex(Eq(e, 0)) for e in eqs],
+        # Free variables are left out, as solve(..., dict=True) does
+        "solution": [{str(k): v for k, v in zip(syms, sol) if v != k} for sol in solutions],
+    }
+
+
+def _system_solve(expr_str, nonlinear):
+    if not nonlinear:
+        return solve_system_of_equations(expr_str)
+    eqs, syms = _parse_system(expr_str)
+    solution = sp.solve(eqs, *syms, dict=True)
+    return _system_result(eqs, syms, [[sol.get(s, s) for s in syms] for sol in solution], nonlinear)
+
+
+def _system_linsolve(expr_str, nonlinear):
+    eqs, syms = _parse_system(expr_str)
+    return _system_result(eqs, syms, list(sp.linsolve(eqs, *syms)), nonlinear)
+
+
+def _system_nonlinsolve(expr_str, nonlinear):
+    if nonlinear:
+        return solve_nonlinear_system(expr_str)
+    eqs, syms = _parse_system(expr_str)
+    return _system_result(eqs, syms, list(sp.nonlinsolve(eqs, syms)), nonlinear)
+
+
+def _integral_parts(expr_str):
+    obj = _safe_parse(expr_str)
+    if isinstance(obj, sp.Integral):
+        return obj.function, obj.limits
+    syms = sorted(obj.free_symbols, key=lambda s: str(s))
+    if not syms:
+        raise ValueError("No free symbol found to integrate with respect to.")
+    return obj, ((syms[0],),)
+
+
+def _integral_with_hints(name, expr_str, **hints):
+    f, limits = _integral_parts(expr_str)
+    res = sp.integrate(f, *[lim if len(lim) > 1 else lim[0] for lim in limits], **hints)
+    if res.has(sp.Integral):
+        raise ValueError(f"{name} left the integral unevaluated")
+    return {"status": "ok", "result": str(res),
+            "details": {"srepr": sp.srepr(res), "latex": latex(res), "method": f"integrate_{name}"}}
+
+
+def _integral_default(expr_str):
+    result = handle_integral(expr_str)
+    if result.get("status") == "ok" and "Integral(" in result.get("details", {}).get("srepr", ""):
+        raise ValueError("integrate left the integral unevaluated")
+    return result
+
+
+# name -> (callable, exact?); equation and system strategies also take `nonlinear`
+STRATEGIES: Dict[str, Dict[str, Any]] = {
+    "equation": {
+        "solve": (_equation_solve, True),
+        "solveset": (_equation_solveset, True),
+        "roots": (_equation_roots, True),
+        "nsolve": (_equation_nsolve, False),
+    },
+    "system": {
+        "solve": (_system_solve, True),
+        "linsolve": (_system_linsolve, True),
+        "nonlinsolve": (_system_nonlinsolve, True),
+    },
+    "integral": {
+        "integrate": (_integral_default, True),
+        "manual": (partial(_integral_with_hints, "manual", manual=True), True),
+        "meijerg": (partial(_integral_with_hints, "meijerg", meijerg=True), True),
+        "risch": (partial(_integral_with_hints, "risch", risch=True), True),
+    },
+}
+
+
+# -------------------------
+# Shape-keyed win statistics
+# -------------------------
+def expression_shape(query_type: str, expr_str: str) -> str:
+    """
+    Coarse structural key used to learn which strategy tends to win, e.g.
+    "equation:v1:poly3" or "integral:v1:exp,sin".
+    """
+    try:
+        if query_type == "integral":
+            f, _ = _integral_parts(expr_str)
+            exprs = [f]
+        else:
+            exprs = [parse_expr(part.replace('=', '-(') + (')' if '=' in part else ''))
+                     for part in expr_str.split(',')]
+        syms = set().union(*(e.free_symbols for e in exprs))
+        funcs = sorted({type(fn).__name__ for e in exprs for fn in e.atoms(sp.Function)})
+        if not funcs and all(e.is_polynomial(*syms) for e in exprs):
+            degree = max((sp.Poly(e, *syms).total_degree() for e in exprs if syms), default=0)
+            body = f"poly{min(degree, 6)}"
+        else:
+            body = ",".join(funcs) or "rational"
+        return f"{query_type}:v{len(syms)}:{body}"
+    except Exception:
+        return f"{query_type}:unparsed"
+
+
+class PortfolioStats:
+    """
+    Thread-safe win counters per expression shape, optionally persisted as JSON.
+    Wins are merged into the file (see _save), never written over it.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self.wins: Dict[str, Dict[str, int]] = self._read() if path else {}
+
+    def order(self, shape: str, names: List[str]) -> List[str]:
+        with self._lock:
+            counts = dict(self.wins.get(shape, {}))
+        # Stable: ties keep the declared order
+        return sorted(names, key=lambda n: -counts.get(n, 0))
+
+    def record(self, shape: str, winner: str) -> None:
+        with self._lock:
+            per_shape = self.wins.setdefault(shape, {})
+            per_shape[winner] = per_shape.get(winner, 0) + 1
+            if self.path:
+                self._save(shape, winner)
+
+    def _read(self) -> Dict[str, Dict[str, int]]:
+        try:
+            with open(self.path, encoding="utf-8") as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self, shape: str, winner: str) -> None:
+        # Add this win to the counts on disk, which other processes update too,
+        # and adopt the merged counts
+        with _file_lock(self.path + ".lock"):
+            wins = self._read()
+            per_shape = wins.setdefault(shape, {})
+            per_shape[winner] = per_shape.get(winner, 0) + 1
+            directory = os.path.dirname(os.path.abspath(self.path))
+            fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                json.dump(wins, fh)
+            os.replace(tmp, self.path)
+        self.wins = wins
+
+
+stats = PortfolioStats(os.getenv("PORTFOLIO_STATS_PATH"))
+
+
+# -------------------------
+# Racing
+# -------------------------
+def _run_strategy(name: str, fn: Callable, args: tuple, out) -> None:
+    start = time.perf_counter()
+    try:
+        result = fn(*args)
+        ok = isinstance(result, dict) and "error" not in result and result.get("status") != "error"
+    except Exception as e:
+        result, ok = {"error": str(e)}, False
+    out.put((name, ok, result, time.perf_counter() - start))
+
+
+def _mp_context():
+    # The fork server is started once per process and imports this module (and
+    # with it SymPy and the solvers) before forking, so strategies start warm
+    # without forking our own, possibly multi-threaded, process.
+    if "forkserver" in mp.get_all_start_methods():
+        ctx = mp.get_context("forkserver")
+        ctx.set_forkserver_preload([__name__])
+        return ctx
+    return mp.get_context("spawn")
+
+
+def _is_nonlinear(query_type: str, expr_str: str) -> bool:
+    # The same test route_query uses to pick the single-strategy solver
+    from utils.router import is_nonlinear_equation, is_nonlinear_system
+    if query_type == "equation":
+        return is_nonlinear_equation(expr_str)
+    return query_type == "system" and is_nonlinear_system(expr_str)
+
+
+def portfolio_solve(query_type: str, expr_str: str, strategies: Optional[List[str]] = None,
+                    timeout: float = 30.0, numeric_grace: float = 1.0,
+                    max_parallel: Optional[int] = None, time_slice: float = 1.0) -> Dict[str, Any]:
+    """
+    Race the strategies registered for `query_type` and return the winner's result.
+
+    Args:
+        query_type: "equation", "system" or "integral"
+        expr_str: expression in the same format route_query accepts
+        strategies: subset of STRATEGIES[query_type] to race (default: all)
+        timeout: overall wall-clock limit in seconds
+        numeric_grace: seconds exact strategies get before a numeric answer is accepted
+        max_parallel: strategies started at once, best-ranked first (default: CPU count, at least 2)
+        time_slice: seconds without a finished strategy after which the next-ranked one
+            starts anyway
+
+    Returns:
+        dict: solver result with "strategy" set, or {"error": ...}
+    """
+    registry = STRATEGIES.get(query_type)
+    if registry is None:
+        return {"error": f"No portfolio for query type: {query_type}"}
+    names = [n for n in (strategies or list(registry)) if n in registry]
+    shape = expression_shape(query_type, expr_str)
+    names = stats.order(shape, names)
+    max_parallel = max_parallel or max(2, os.cpu_count() or 1)
+    args = (expr_str,) if query_type == "integral" else (expr_str, _is_nonlinear(query_type, expr_str))
+
+    ctx = _mp_context()
+    out = ctx.Queue()
+    procs = {}
+    waiting = list(names)
+
+    def launch_next():
+        name = waiting.pop(0)
+        p = ctx.Process(target=_run_strategy, args=(name, registry[name][0], args, out), daemon=True)
+        p.start()
+        procs[name] = p
+
+    while waiting and len(procs) < max_parallel:
+        launch_next()
+
+    start = time.perf_counter()
+    next_launch = start + time_slice
+    exact_pending = {n for n in names if registry[n][1]}
+    numeric_result = None
+    errors: Dict[str, str] = {}
+    winner = None
+    finished = 0
+    try:
+        while finished < len(names):
+            elapsed = time.perf_counter() - start
+            if numeric_result and (not exact_pending or elapsed >= numeric_grace):
+                break
+            wait_for = (numeric_grace if numeric_result else timeout) - elapsed
+            if wait_for <= 0:
+                break
+            if waiting:
+                now = time.perf_counter()
+                if now >= next_launch:
+                    launch_next()
+                    next_launch = now + time_slice
+                    continue
+                wait_for = min(wait_for, next_launch - now)
+            try:
+                name, ok, result, _ = out.get(timeout=wait_for)
+            except queue.Empty:
+                continue
+            finished += 1
+            exact_pending.discard(name)
+            if waiting:
+                launch_next()
+                next_launch = time.perf_counter() + time_slice
+            if not ok:
+                errors[name] = result.get("error", "failed")
+            elif registry[name][1]:
+                winner = (name, result)
+                break
+            else:
+                numeric_result = (name, result)
+    finally:
+        for p in procs.values():
+            if p.is_alive():
+                p.terminate()
+        for p in procs.values():
+            p.join(timeout=1)
+        out.close()
+
+    winner = winner or numeric_result
+    if winner is None:
+        if time.perf_counter() - start >= timeout:
+            return {"error": f"No strategy finished within {timeout:g}s"}
+        return {"error": "; ".join(f"{n}: {e}" for n, e in errors.items())}
+
+    name, result = winner
+    stats.record(shape, name)
+    return {**result, "strategy": name}
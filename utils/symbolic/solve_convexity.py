@@ -2,22 +2,36 @@ import sympy as sp
 from sympy import *
 from sympy.parsing.sympy_parser import parse_expr, standard_transformations, implicit_multiplication_application
 
+from . import backend
+from .cse import should_compress, compressed_derivatives
+from .guards import ExpressionTooLarge, check_size, memory_stage
+from .handlers import parse_input
+from .workspace import NO_WORKSPACE
+
 transformations = (standard_transformations + (implicit_multiplication_application,))
 
 
 
-def solve_convexity(expr_str):
+def solve_convexity(expr_str, workspace=None):
+    """
+    workspace: session Workspace whose artifacts are reused (see utils.symbolic.workspace).
+    """
+    ws = NO_WORKSPACE if workspace is None else workspace
     try:
         symbols = sp.symbols('x y z')  # expand if needed
-        expr = parse_expr(expr_str)
+        expr = parse_input(expr_str, ws)
         x = symbols[0] if expr.free_symbols else sp.symbols('x')
-        derivative = sp.diff(expr, x)
-        second_derivative = sp.diff(derivative, x)
+        with memory_stage("differentiate"):
+            derivative = ws.get("diff", (expr, x), lambda: check_size(backend.diff(expr, x), "differentiation"))
+            second_derivative = ws.get("diff", (derivative, x),
+                                       lambda: check_size(backend.diff(derivative, x), "differentiation"))
         is_convex = sp.simplify(second_derivative >= 0)
         convex_condition = second_derivative >= 0
 
         # Reduce inequality to find convex domain
-        convex_domain = sp.reduce_inequalities([convex_condition], x)
+        with memory_stage("reduce_inequalities"):
+            convex_domain = ws.get("reduce_inequalities", (convex_condition, x),
+                                   lambda: check_size(sp.reduce_inequalities([convex_condition], x), "reduce_inequalities"))
         return {
             "expression": sp.latex(expr),
             "first_derivative": sp.latex(derivative),
@@ -25,25 +39,50 @@ def solve_convexity(expr_str):
             "is_convex": sp.latex(is_convex),
             "convex_domain":sp.latex(convex_domain)
         }
+    except ExpressionTooLarge as e:
+        return e.as_result()
     except Exception as e:
         return {"error": str(e)}
     
 
 from sympy import Matrix
 
-def analyze_multivariable_convexity(expr_str):
+def analyze_multivariable_convexity(expr_str, compress=None, workspace=None):
+    """
+    compress: True/False forces the CSE-compressed output (see utils.symbolic.cse);
+    None switches to it when the Hessian exceeds the operation-count threshold.
+    workspace: session Workspace whose artifacts are reused (see utils.symbolic.workspace).
+    """
+    ws = NO_WORKSPACE if workspace is None else workspace
     try:
         # Extract and sort variable symbols
-        expr = sp.sympify(expr_str)
+        expr = parse_input(expr_str, ws)
         vars = sorted(expr.free_symbols, key=lambda s: s.name)
         symbols = list(vars)
 
         # Gradient and Hessian computation
-        gradient = [sp.diff(expr, var) for var in symbols]
-        hessian = Matrix([[sp.diff(g, var) for var in symbols] for g in gradient])
+        with memory_stage("differentiate"):
+            gradient, hessian = ws.get("gradient_and_hessian", (expr, tuple(symbols)),
+                                       lambda: check_size(backend.gradient_and_hessian(expr, symbols), "differentiation"))
+
+        if should_compress(list(hessian), compress):
+            with memory_stage("minors"):
+                bundle = ws.get("compressed_derivatives", (expr, tuple(symbols)),
+                                lambda: compressed_derivatives(expr, symbols, gradient, hessian))
+            return {
+                "expression": sp.latex(expr),
+                "variables": [str(v) for v in symbols],
+                "shared_subexpressions": bundle["subexpressions"],
+                "gradient": bundle["gradient_latex"],
+                "hessian": bundle["hessian_latex"],
+                "leading_principal_minors": bundle["minors_latex"],
+                "is_convex_note": "All leading principal minors should be ≥ 0 for convexity (symbolically)."
+            }
 
         # Leading principal minors (symbolic)
-        hessian_dets = [hessian[:i, :i].det() for i in range(1, len(symbols) + 1)]
+        with memory_stage("minors"):
+            hessian_dets = ws.get("leading_minors", (sp.ImmutableMatrix(hessian),),
+                                  lambda: check_size(backend.leading_minors(hessian), "determinant"))
 
         return {
             "expression": sp.latex(expr),
@@ -53,5 +92,7 @@ def analyze_multivariable_convexity(expr_str):
             "leading_principal_minors": [sp.latex(d) for d in hessian_dets],
             "is_convex_note": "All leading principal minors should be ≥ 0 for convexity (symbolically)."
         }
+    except ExpressionTooLarge as e:
+        return e.as_result()
     except Exception as e:
         return {"error": str(e)}
\ No newline at end of file
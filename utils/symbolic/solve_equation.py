@@ -1,6 +1,7 @@
 from sympy import Eq, solve, sympify, latex
 from sympy.parsing.sympy_parser import parse_expr
 from sympy.core.numbers import I
+from .guards import ExpressionTooLarge, check_size, memory_stage
 
 def solve_equation(expr_str):
     
@@ -15,7 +16,8 @@ def solve_equation(expr_str):
         rhs = parse_expr(rhs_str.strip())
         equation = Eq(lhs, rhs)
 
-        solution = solve(equation)
+        with memory_stage("solve"):
+            solution = check_size(solve(equation), "solve")
 
         all_real = all(not sol.has(I) for sol in solution)
         all_complex = all(sol.has(I) for sol in solution)
@@ -26,6 +28,8 @@ def solve_equation(expr_str):
             "all_roots_real": all_real,
             "all_roots_complex": all_complex,
         }
+    except ExpressionTooLarge as e:
+        return e.as_result()
     except Exception as e:
         return {"error": str(e)}
     
@@ -42,7 +46,8 @@ def solve_nonlinear_equation(expr_str):
         rhs = parse_expr(rhs_str.strip())
         equation = Eq(lhs, rhs)
 
-        solution = solve(equation)
+        with memory_stage("solve"):
+            solution = check_size(solve(equation), "solve")
 
         all_real = all(not sol.has(I) for sol in solution)
         all_complex = all(sol.has(I) for sol in solution)
@@ -51,5 +56,7 @@ def solve_nonlinear_equation(expr_str):
             "equation": latex(equation),
             "solution": [latex(sol) for sol in solution]
         }
+    except ExpressionTooLarge as e:
+        return e.as_result()
     except Exception as e:
         return {"error": str(e)}
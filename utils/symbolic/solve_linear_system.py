@@ -1,5 +1,6 @@
 from sympy import symbols, Eq, solve, latex
 from sympy.parsing.sympy_parser import parse_expr
+from .guards import ExpressionTooLarge, check_size, memory_stage
 
 def solve_system_of_equations(equation_strs):
     try:
@@ -15,11 +16,14 @@ def solve_system_of_equations(equation_strs):
         # Convert each expression to an equality (assume == 0)
         equations = [Eq(expr, 0) for expr in eqs]
         
-        solution = solve(equations, *all_symbols, dict=True)
+        with memory_stage("solve"):
+            solution = check_size(solve(equations, *all_symbols, dict=True), "solve")
 
         return {
             "equations": [latex(eq) for eq in equations],
             "solution": [ {str(k): v for k, v in sol.items()} for sol in solution]
         }
+    except ExpressionTooLarge as e:
+        return e.as_result()
     except Exception as e:
         return {"error": str(e)}
@@ -0,0 +1,238 @@
+"""
+Session workspaces: reuse of parsed expressions and computed artifacts across
+follow-up queries about the same function.
+
+A chain like "derivative of f", "is f convex", "integrate f" re-parses and
+re-differentiates f every time. The handlers (handle_derivative,
+solve_convexity, analyze_multivariable_convexity, handle_integral) instead ask
+the request's Workspace for each artifact:
+
+    f1 = ws.get("diff", (f, x), lambda: backend.diff(f, x))
+
+Artifacts are keyed by operation and SymPy arguments (structural equality), so
+a derivative computed for one query is found by any later query that needs the
+derivative of the same expression, whichever handler asks. For that, every
+handler parses through handlers.parse_input (one "parse" artifact) and
+differentiates that parsed expression, not a simplified form. Deterministic
+failures (DETERMINISTIC_ERRORS, e.g. reduce_inequalities raising
+NotImplementedError) are cached and re-raised too, as they are often as slow
+as successes; MemoryError, RecursionError and the like are not. Without a
+workspace (NO_WORKSPACE) everything is computed as before.
+
+Memory is bounded by size, not just count: every stored artifact is charged its
+operation count (guards.expression_size, the measure check_size limits), and
+  - a session keeps at most max_artifacts artifacts and max_ops operations (LRU);
+  - the store keeps at most max_total_ops operations over all sessions, dropping
+    least recently used sessions when a session is fetched;
+  - at most max_sessions sessions are kept (LRU), and sessions idle for
+    idle_timeout seconds are dropped.
+metrics() reports reuse rates and sizes.
+
+Configuration via environment (see WorkspaceStore.from_env):
+  WORKSPACE_MAX_SESSIONS, WORKSPACE_MAX_ARTIFACTS, WORKSPACE_MAX_OPS,
+  WORKSPACE_MAX_TOTAL_OPS, WORKSPACE_IDLE_S
+"""
+
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Dict, Tuple
+
+from sympy.polys.polyerrors import BasePolynomialError
+
+from .guards import ExpressionTooLarge, expression_size
+
+# Failures that depend only on the input, so a cached one is what a retry would raise
+DETERMINISTIC_ERRORS = (NotImplementedError, ValueError, TypeError, ArithmeticError,
+                        BasePolynomialError, ExpressionTooLarge)
+
+
+class _Failed:
+    def __init__(self, error: Exception):
+        self.error = error
+
+
+def artifact_size(value: Any) -> int:
+    """Operations charged to a stored artifact (at least 1)."""
+    if isinstance(value, _Failed):
+        return 1
+    try:
+        return max(1, expression_size(value))
+    except Exception:
+        return 1
+
+
+class Workspace:
+    """
+    Artifact cache for one session.
+
+    Args:
+        max_artifacts: artifacts kept (LRU)
+        max_ops: total artifact size kept (LRU); larger artifacts are not stored
+    """
+
+    def __init__(self, max_artifacts: int = 256, max_ops: int = 200_000):
+        self.max_artifacts = max_artifacts
+        self.max_ops = max_ops
+        self.ops = 0
+        self.hits: Counter = Counter()
+        self.misses: Counter = Counter()
+        self.evicted = 0
+        self.last_used = time.monotonic()
+        self._artifacts: "OrderedDict[Tuple, Tuple[Any, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._artifacts)
+
+    def get(self, op: str, key: Tuple, compute: Callable[[], Any]) -> Any:
+        """Cached result of `compute()` for (op, *key); computed and stored on a miss."""
+        k = (op,) + tuple(key)
+        with self._lock:
+            self.last_used = time.monotonic()
+            if k in self._artifacts:
+                self._artifacts.move_to_end(k)
+                self.hits[op] += 1
+                value = self._artifacts[k][0]
+                if isinstance(value, _Failed):
+                    raise value.error.with_traceback(None)
+                return value
+        try:
+            value = compute()
+        except DETERMINISTIC_ERRORS as e:
+            self._store(op, k, _Failed(e))
+            raise
+        except Exception:
+            with self._lock:
+                self.misses[op] += 1
+            raise
+        self._store(op, k, value)
+        return value
+
+    def _store(self, op: str, k: Tuple, value: Any) -> None:
+        size = artifact_size(value)
+        with self._lock:
+            self.misses[op] += 1
+            if size > self.max_ops:
+                return
+            if k in self._artifacts:  # computed concurrently by another request
+                self.ops -= self._artifacts.pop(k)[1]
+            self._artifacts[k] = (value, size)
+            self.ops += size
+            while len(self._artifacts) > self.max_artifacts or self.ops > self.max_ops:
+                self.ops -= self._artifacts.popitem(last=False)[1][1]
+                self.evicted += 1
+
+
+class _NoWorkspace:
+    """Stand-in used when a handler is called without a session: always computes."""
+
+    def get(self, op: str, key: Tuple, compute: Callable[[], Any]) -> Any:
+        return compute()
+
+
+NO_WORKSPACE = _NoWorkspace()
+
+
+class WorkspaceStore:
+    """
+    Args:
+        max_sessions: live sessions kept; the least recently used is dropped beyond it
+        max_artifacts: artifacts kept per session (LRU)
+        max_ops: artifact size kept per session (LRU)
+        max_total_ops: artifact size kept over all sessions; least recently used
+            sessions are dropped beyond it
+        idle_timeout: seconds without a query after which a session is dropped
+    """
+
+    def __init__(self, max_sessions: int = 1000, max_artifacts: int = 256, max_ops: int = 200_000,
+                 max_total_ops: int = 5_000_000, idle_timeout: float = 1800.0):
+        self.max_sessions = max_sessions
+        self.max_artifacts = max_artifacts
+        self.max_ops = max_ops
+        self.max_total_ops = max_total_ops
+        self.idle_timeout = idle_timeout
+        self._sessions: "OrderedDict[str, Workspace]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Counters of dropped sessions, so metrics cover the whole process lifetime
+        self._retired_hits: Counter = Counter()
+        self._retired_misses: Counter = Counter()
+        self._evicted = Counter()
+
+    @classmethod
+    def from_env(cls) -> "WorkspaceStore":
+        return cls(
+            max_sessions=int(os.getenv("WORKSPACE_MAX_SESSIONS", "1000")),
+            max_artifacts=int(os.getenv("WORKSPACE_MAX_ARTIFACTS", "256")),
+            max_ops=int(os.getenv("WORKSPACE_MAX_OPS", "200000")),
+            max_total_ops=int(os.getenv("WORKSPACE_MAX_TOTAL_OPS", "5000000")),
+            idle_timeout=float(os.getenv("WORKSPACE_IDLE_S", "1800")),
+        )
+
+    def get(self, session_id: str) -> Workspace:
+        """Workspace for the session, created if new or expired."""
+        with self._lock:
+            self._expire()
+            ws = self._sessions.get(session_id)
+            if ws is None:
+                ws = self._sessions[session_id] = Workspace(self.max_artifacts, self.max_ops)
+                while len(self._sessions) > self.max_sessions:
+                    self._retire(self._sessions.popitem(last=False)[1], "lru")
+            self._sessions.move_to_end(session_id)
+            ws.last_used = time.monotonic()
+            self._shrink()
+            return ws
+
+    def _expire(self) -> None:
+        # Sessions are kept in last-access order, so idle ones are at the front
+        cutoff = time.monotonic() - self.idle_timeout
+        while self._sessions:
+            sid, ws = next(iter(self._sessions.items()))
+            if ws.last_used > cutoff:
+                break
+            del self._sessions[sid]
+            self._retire(ws, "idle")
+
+    def _shrink(self) -> None:
+        # Growth between fetches is bounded by max_ops per active session
+        total = sum(ws.ops for ws in self._sessions.values())
+        while total > self.max_total_ops and len(self._sessions) > 1:
+            ws = self._sessions.popitem(last=False)[1]
+            total -= ws.ops
+            self._retire(ws, "size")
+
+    def _retire(self, ws: Workspace, reason: str) -> None:
+        self._retired_hits.update(ws.hits)
+        self._retired_misses.update(ws.misses)
+        self._evicted[reason] += 1
+        self._evicted["artifacts"] += ws.evicted
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            self._expire()
+            hits, misses = Counter(self._retired_hits), Counter(self._retired_misses)
+            for ws in self._sessions.values():
+                hits.update(ws.hits)
+                misses.update(ws.misses)
+            artifacts = sum(len(ws) for ws in self._sessions.values())
+            ops = sum(ws.ops for ws in self._sessions.values())
+            artifacts_evicted = self._evicted["artifacts"] + sum(ws.evicted for ws in self._sessions.values())
+            sessions = len(self._sessions)
+        total_hits, total = sum(hits.values()), sum(hits.values()) + sum(misses.values())
+        return {
+            "sessions": sessions,
+            "artifacts": artifacts,
+            "ops": ops,
+            "max_total_ops": self.max_total_ops,
+            "hits": total_hits,
+            "misses": total - total_hits,
+            "reuse_rate": round(total_hits / total, 4) if total else 0.0,
+            "by_operation": {
+                op: {"hits": hits[op], "misses": misses[op],
+                     "reuse_rate": round(hits[op] / (hits[op] + misses[op]), 4)}
+                for op in sorted(set(hits) | set(misses))
+            },
+            "sessions_evicted": {reason: self._evicted[reason] for reason in ("idle", "lru", "size")},
+            "artifacts_evicted": artifacts_evicted,
+        }
@@ -0,0 +1,126 @@
+"""
+Traffic capture and replay support.
+
+Capture is off unless TRAFFIC_CAPTURE_PATH is set. When enabled, every request to
+main.index appends one JSON line to that file:
+
+  {"ts": 1700000000.0, "query": "...", "category": "...", "explanation": "...",
+   "expression": "...", "timings_ms": {"classify": .., "explain": .., ...},
+   "error": null, "memory": {...}}
+
+ReplayClient answers Gemini prompts from such a log so captured traffic can be
+re-run (benchmarks/replay.py) without calling the real LLM.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+from utils.fake_llm import FakeGeminiClient, prompt_kind
+
+
+class RequestTrace:
+    """
+    Collects the LLM outputs and per-stage timings of a single request.
+    """
+
+    def __init__(self, query: str):
+        self.ts = time.time()
+        self.query = query
+        self.category: Optional[str] = None
+        self.explanation: Optional[str] = None
+        self.expression: Optional[str] = None
+        self.error: Optional[str] = None
+        self.timings_ms: Dict[str, float] = {}
+        self.memory: Optional[Dict[str, Any]] = None
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings_ms[name] = round((time.perf_counter() - start) * 1000, 3)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "ts": self.ts,
+            "query": self.query,
+            "category": self.category,
+            "explanation": self.explanation,
+            "expression": self.expression,
+            "timings_ms": self.timings_ms,
+            "error": self.error,
+            "memory": self.memory,
+        }
+
+
+class TrafficRecorder:
+    """
+    Append-only JSON-lines writer, safe to share between request threads.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> Optional["TrafficRecorder"]:
+        path = os.getenv("TRAFFIC_CAPTURE_PATH")
+        return cls(path) if path else None
+
+    def record(self, trace: RequestTrace) -> None:
+        line = json.dumps(trace.to_dict(), ensure_ascii=False, default=str)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as fh:
+                fh.write(line + "\n")
+
+
+def load_traffic(path: str) -> List[Dict[str, Any]]:
+    """
+    Read a capture log, skipping blank or truncated lines, ordered by timestamp.
+    """
+    records = []
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    records.sort(key=lambda r: r.get("ts", 0))
+    return records
+
+
+class ReplayClient(FakeGeminiClient):
+    """
+    Fake Gemini client that answers with the recorded category, explanation and
+    extracted expression of the captured request carrying the same query.
+    """
+
+    def __init__(self, records: List[Dict[str, Any]], latency: float = 0.0):
+        self._by_query: Dict[str, Dict[str, Any]] = {}
+        for rec in records:
+            self._by_query[rec["query"]] = rec
+        super().__init__(responder=self._replay, latency=latency)
+
+    @classmethod
+    def from_log(cls, path: str, latency: float = 0.0) -> "ReplayClient":
+        return cls(load_traffic(path), latency=latency)
+
+    def _replay(self, prompt: str) -> str:
+        kind, query = prompt_kind(prompt)
+        rec = self._by_query.get(query)
+        if rec is None:
+            raise KeyError(f"No recorded traffic for query: {query!r}")
+        field = {"classify": "category", "extract": "expression", "explain": "explanation"}[kind]
+        value = rec.get(field)
+        if not value:
+            raise ValueError(f"Recorded request has no {field} for query: {query!r}")
+        return value
+
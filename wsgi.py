@@ -0,0 +1,69 @@
+"""
+Production entry point for pre-fork servers (see gunicorn.conf.py).
+
+Importing this module in the master process, before workers are forked:
+  - imports the app, SymPy and the ML classifier (weights load once and are
+    shared copy-on-write by every worker),
+  - warms SymPy's caches by running WARMUP_CORPUS through route_query,
+  - moves everything allocated so far out of the garbage collector's view
+    (gc.freeze) so collections in the workers don't touch, and thereby copy,
+    the shared pages.
+
+The Gemini client is NOT created here: it holds sockets and threads that must
+not cross a fork. Each worker builds its own in post_fork (init_worker), and
+main.get_llm_scheduler() creates it lazily for servers without that hook.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+
+import gc
+import os
+import time
+
+from main import app, init_llm
+from utils.router import route_query
+
+WARMUP_CORPUS = [
+    ("convexity", "x**2 - 3*x + 2"),
+    ("convexity", "exp(x) + log(x)"),
+    ("convexity", "x**2 + x*y + y**2"),
+    ("equation", "x + 1 = 3"),
+    ("equation", "x**2 - 4 = 0"),
+    ("equation", "sin(x) = 1/2"),
+    ("system", "x + y - 2, x - y - 3"),
+    ("system", "x**2 + y**2 - 5, x*y - 2"),
+    ("derivative", "x**3 - 3*x"),
+    ("derivative", "x**2*y + y**3"),
+    ("integral", "Integral(x*exp(x), x)"),
+    ("integral", "Integral(x**2, (x, 0, 1))"),
+]
+
+
+def warm_up(corpus=WARMUP_CORPUS, verbose=False):
+    """Run a representative corpus through route_query (and the classifier) once."""
+    start = time.perf_counter()
+    for query_type, expr in corpus:
+        route_query(query_type, expr, portfolio=False)
+    try:
+        from utils.symbolic.ml_classifier import ml_classify
+        ml_classify("x**2 + y")
+    except Exception as e:
+        print("Classifier warm-up skipped:", e)
+    if verbose:
+        print(f"Warm-up: {len(corpus)} queries in {time.perf_counter() - start:.2f}s")
+
+
+def init_worker():
+    """Per-worker setup after fork: own Gemini client, one torch thread per worker."""
+    from config import configure_genai
+    try:
+        import torch
+        torch.set_num_threads(int(os.getenv("TORCH_NUM_THREADS", "1")))
+    except Exception:
+        pass
+    init_llm(configure_genai())
+
+
+if os.getenv("SKIP_WARMUP", "").lower() not in ("1", "true", "yes"):
+    warm_up(verbose=True)
+gc.freeze()